@@ -0,0 +1,124 @@
+"""
+Micro-benchmark comparing full standard library decoding of Spotify responses with
+bpm.decoding.loads_selective(), per request.
+
+The payloads are generated to match the shape and formatting of real search and track
+responses (including the available_markets arrays on every track and album).
+
+Usage::
+
+    python benchmarks/decoding.py
+
+"""
+
+import json
+import os
+import random
+import string
+import sys
+import timeit
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from bpm import decoding
+
+
+MARKETS = [a + b for a in string.ascii_uppercase for b in string.ascii_uppercase][:183]
+
+
+def _id(rand: random.Random) -> str:
+    return "".join(rand.choice(string.ascii_letters + string.digits) for _ in range(22))
+
+
+def _artist(rand: random.Random) -> dict:
+    artist_id = _id(rand)
+    return {"external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+            "href": f"https://api.spotify.com/v1/artists/{artist_id}",
+            "id": artist_id,
+            "name": f"Artist {artist_id[:6]}",
+            "type": "artist",
+            "uri": f"spotify:artist:{artist_id}"}
+
+
+def _track(rand: random.Random) -> dict:
+    track_id, album_id = _id(rand), _id(rand)
+    artists = [_artist(rand) for _ in range(rand.randint(1, 3))]
+    return {"album": {"album_type": "album",
+                      "artists": artists[:1],
+                      "available_markets": MARKETS,
+                      "external_urls": {"spotify": f"https://open.spotify.com/album/{album_id}"},
+                      "href": f"https://api.spotify.com/v1/albums/{album_id}",
+                      "id": album_id,
+                      "images": [{"height": size,
+                                  "url": f"https://i.scdn.co/image/{_id(rand)}",
+                                  "width": size} for size in (640, 300, 64)],
+                      "name": f"Album {album_id[:6]}",
+                      "release_date": "1973-03-01",
+                      "release_date_precision": "day",
+                      "total_tracks": 10,
+                      "type": "album",
+                      "uri": f"spotify:album:{album_id}"},
+            "artists": artists,
+            "available_markets": MARKETS,
+            "disc_number": 1,
+            "duration_ms": 382296,
+            "explicit": False,
+            "external_ids": {"isrc": "GBN9Y1100088"},
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+            "href": f"https://api.spotify.com/v1/tracks/{track_id}",
+            "id": track_id,
+            "is_local": False,
+            "name": f"Track {track_id[:6]}",
+            "popularity": 70,
+            "preview_url": f"https://p.scdn.co/mp3-preview/{_id(rand)}",
+            "track_number": 6,
+            "type": "track",
+            "uri": f"spotify:track:{track_id}"}
+
+
+def _encode(data: dict) -> bytes:
+    # spotify pretty prints its responses with a space either side of the colon
+    return json.dumps(data, indent=2, separators=(",", " : ")).encode()
+
+
+def payloads() -> dict:
+    rand = random.Random(0)
+    search = {"tracks": {"href": "https://api.spotify.com/v1/search?query=money&type=track",
+                         "items": [_track(rand) for _ in range(20)],
+                         "limit": 20,
+                         "next": "https://api.spotify.com/v1/search?query=money&offset=20",
+                         "offset": 0,
+                         "previous": None,
+                         "total": 1000}}
+    return {"search": _encode(search), "track": _encode(_track(rand))}
+
+
+def _time(decode, content: bytes, number: int = 200) -> float:
+    return min(timeit.repeat(lambda: decode(content), number=number, repeat=5)) / number
+
+
+def _allocated(decode, content: bytes) -> int:
+    tracemalloc.start()
+    data = decode(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return peak
+
+
+def main() -> None:
+    parser = "orjson" if decoding.orjson is not None else "json"
+    decoders = {"json.loads": json.loads,
+                f"loads ({parser})": decoding.loads,
+                f"loads_selective ({parser})": decoding.loads_selective}
+    for name, content in payloads().items():
+        print(f"{name} payload: {len(content)} bytes")
+        for decoder_name, decode in decoders.items():
+            seconds = _time(decode, content)
+            peak = _allocated(decode, content)
+            print(f"  {decoder_name:28} {seconds * 1e6:8.1f} us/request "
+                  f"{peak / 1024:8.1f} KiB peak allocation")
+
+
+if __name__ == "__main__":
+    main()
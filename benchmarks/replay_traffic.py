@@ -0,0 +1,67 @@
+"""
+Replays a recorded traffic log against the Flask app, serving Spotify API responses from a
+cassette, and reports request latency percentiles.
+
+Record a cassette by running the app with SPOTIFY_CASSETTE set and
+SPOTIFY_CASSETTE_MODE=record, then replay the same traffic offline. The traffic log has one
+request per line, for example::
+
+    GET /track/4ZtFanR9U6ndgddUvNcjcG
+    POST /search track=money
+
+Usage::
+
+    python benchmarks/replay_traffic.py <cassette> <traffic_log> [latency_scale]
+
+"""
+
+import os
+import statistics
+import sys
+import time
+from urllib.parse import parse_qsl
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+def read_traffic(path: str) -> list:
+    requests = []
+    with open(path) as traffic:
+        for line in traffic:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            method, url = parts[0], parts[1]
+            data = dict(parse_qsl(parts[2])) if len(parts) > 2 else None
+            requests.append((method, url, data))
+    return requests
+
+
+def main(cassette_path: str, traffic_path: str, latency_scale: str = "1.0") -> None:
+    os.environ["SPOTIFY_CASSETTE"] = cassette_path
+    os.environ["SPOTIFY_CASSETTE_MODE"] = "replay"
+    os.environ["SPOTIFY_CASSETTE_LATENCY_SCALE"] = latency_scale
+    # credentials are not sent anywhere when replaying
+    os.environ.setdefault("CLIENT_ID", "replay")
+    os.environ.setdefault("CLIENT_SECRET", "replay")
+
+    from bpm import create_app
+    client = create_app().test_client()
+
+    latencies = []
+    errors = 0
+    for method, url, data in read_traffic(traffic_path):
+        start = time.perf_counter()
+        response = client.open(url, method=method, data=data)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 500
+
+    latencies.sort()
+    percentile = lambda share: latencies[min(len(latencies) - 1, int(len(latencies) * share))]
+    print(f"{len(latencies)} requests, {errors} errors")
+    print(f"mean {statistics.mean(latencies) * 1000:.1f} ms, "
+          f"p50 {percentile(0.5) * 1000:.1f} ms, p95 {percentile(0.95) * 1000:.1f} ms, "
+          f"p99 {percentile(0.99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
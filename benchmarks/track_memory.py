@@ -0,0 +1,80 @@
+"""
+Memory benchmark comparing Track records with the per-track dicts previously returned by
+SpotifyAPI.
+
+Usage::
+
+    python benchmarks/track_memory.py [number_of_tracks]
+
+"""
+
+import os
+import sys
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from bpm.spotify import SpotifyAPI
+from bpm.track import Track, encode_key, format_images
+
+
+ARTISTS = 20000
+
+# spotify returns each album cover in three sizes, with image ids that differ by a size prefix
+IMAGE_SIZES = (("ab67616d0000b273", 640), ("ab67616d00001e02", 300), ("ab67616d00004851", 64))
+
+
+def _fields(i: int) -> tuple:
+    # build fresh strings for every track, as json decoding of separate responses would
+    track_id = f"{i:022d}"
+    artist = "".join(["artist ", str(i % ARTISTS)])
+    key, mode = i % 12, i % 2
+    images = [{"url": f"https://i.scdn.co/image/{prefix}{i:024x}", "width": size,
+               "height": size} for prefix, size in IMAGE_SIZES]
+    return (track_id, f"track {i}", artist, f"https://open.spotify.com/track/{track_id}",
+            images, key, mode, 60 + i % 140)
+
+
+def build_dicts(count: int) -> list:
+    tracks = []
+    for i in range(count):
+        track_id, name, artist, track_url, images, key, mode, tempo = _fields(i)
+        tracks.append({"track_id": track_id,
+                       "key": SpotifyAPI.key_convert(key, mode),
+                       "tempo": tempo,
+                       "track_name": name,
+                       "artist": artist,
+                       "track_url": track_url,
+                       "image_url": images[0]["url"]})
+    return tracks
+
+
+def build_tracks(count: int) -> list:
+    tracks = []
+    for i in range(count):
+        track_id, name, artist, track_url, images, key, mode, tempo = _fields(i)
+        tracks.append(Track(track_id, track_name=name, artist=artist, track_url=track_url,
+                            images=format_images(images), key_code=encode_key(key, mode),
+                            tempo=tempo))
+    return tracks
+
+
+def measure(build, count: int) -> int:
+    tracemalloc.start()
+    tracks = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tracks
+    return current
+
+
+def main(count: int = 1000000) -> None:
+    dict_bytes = measure(build_dicts, count)
+    track_bytes = measure(build_tracks, count)
+    print(f"{count} tracks")
+    print(f"dict:  {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / count:.0f} bytes/track)")
+    print(f"Track: {track_bytes / 2**20:8.1f} MiB ({track_bytes / count:.0f} bytes/track)")
+    print(f"saving: {1 - track_bytes / dict_bytes:.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
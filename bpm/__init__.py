@@ -9,6 +9,8 @@ import os
 
 from flask import Flask, Blueprint
 
+from . import admission, assets, catalogue, profiling, snapshot, views
+from .suggest import PrefixCache
 from .views import main
 
 
@@ -23,7 +25,41 @@ def create_app(test_config=None) -> Flask:
     
     """
     app = Flask(__name__, instance_relative_config=True)
-    app.config.from_mapping(SECRET_KEY="dev")
+    app.config.from_mapping(
+        SECRET_KEY="dev",
+        # directory for the local album cover cache, the image proxy is disabled if None
+        THUMBNAIL_CACHE_DIR=None,
+        THUMBNAIL_MAX_AGE=31536000,
+        THUMBNAIL_CACHE_MAX_BYTES=256 * 2**20,
+        # bounds for the search-as-you-type suggestion cache
+        SUGGEST_MAX_PREFIXES=10000,
+        SUGGEST_MAX_RESULTS=10,
+        SUGGEST_MAX_LENGTH=64,
+        SUGGEST_DEBOUNCE=0.3,
+        # on-demand request profiling - see bpm.profiling
+        PROFILING_ENABLED=False,
+        PROFILING_HEADER="X-BPM-Profile",
+        PROFILING_SAMPLE_RATE=0.0,
+        PROFILING_DIR=None,
+        PROFILING_SECRET=None,
+        PROFILING_MAX_DUMPS=100,
+        # admission control for routes that make Spotify API requests - see bpm.admission
+        ADMISSION_ENABLED=True,
+        ADMISSION_LIMITS={},
+        ADMISSION_DEFAULT_LIMIT=8,
+        ADMISSION_QUEUE_SIZE=4,
+        ADMISSION_TIMEOUT=5.0,
+        ADMISSION_RETRY_AFTER=1,
+        # size and time-to-live of each of the Spotify API caches - see bpm.spotify
+        SPOTIFY_CACHE_SIZE=10000,
+        SPOTIFY_CACHE_TTL=3600,
+        # snapshot file for warm restarts of the Spotify API caches - see bpm.snapshot
+        CACHE_SNAPSHOT_PATH=None,
+        CACHE_SNAPSHOT_INTERVAL=None,
+        # SQLite database of resolved tracks for the /export route - see bpm.catalogue
+        CATALOGUE_PATH=None,
+        CATALOGUE_EXPORT_TOKEN=None,
+    )
 
     app.register_blueprint(main)
 
@@ -33,5 +69,20 @@ def create_app(test_config=None) -> Flask:
     else:
         # load the test config if passed in
         app.config.from_mapping(test_config)
+
+    client = getattr(views, "spotify", None)
+    if client is not None:
+        client.set_cache_limits(app.config["SPOTIFY_CACHE_SIZE"], app.config["SPOTIFY_CACHE_TTL"])
+
+    admission.init_app(app)
+    assets.init_app(app)
+    profiling.init_app(app)
+    catalogue.init_app(app, client)
+    snapshot.init_app(app, client)
+    app.extensions["suggestions"] = PrefixCache(
+        max_prefixes=app.config["SUGGEST_MAX_PREFIXES"],
+        max_results=app.config["SUGGEST_MAX_RESULTS"],
+        max_length=app.config["SUGGEST_MAX_LENGTH"],
+        debounce=app.config["SUGGEST_DEBOUNCE"])
     return app
 
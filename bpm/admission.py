@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Admission
+
+This module implements admission control for views that make requests to the Spotify API. Each
+route has a bounded number of requests in flight and a bounded queue of requests waiting for
+one to finish. Requests that can't be queued, or that wait too long, get a fast 503 response
+with a Retry-After header instead of piling up behind a slow upstream. Requests that can be
+served from the cache skip the limit entirely, so they are never held up by requests waiting
+on Spotify.
+
+Limits are counted per process, so they only take effect if each process handles requests
+concurrently, eg gunicorn's gthread worker class. The limits and queues of the routes should
+add up to fewer than the worker's threads, so that cached requests always find a free thread.
+
+Typical usage example::
+
+    @main.route('/track/<id>')
+    @limit_upstream(lambda: spotify.is_track_cached(request.view_args.get('id')))
+    def main_track_details(id):
+        ...
+
+"""
+
+import functools
+import threading
+from typing import Callable
+
+from flask import Flask, current_app, request
+
+
+class AdmissionController():
+    """
+    Limits the number of requests in flight, with a bounded queue of waiting requests.
+
+    Attributes:
+        limit: maximum number of requests in flight.
+        queue_size: maximum number of requests waiting for a request in flight to finish.
+        timeout: maximum number of seconds a request waits in the queue.
+
+    """
+
+
+    def __init__(self, limit: int, queue_size: int, timeout: float) -> None:
+        """Inits AdmissionController class.
+
+        Args:
+            limit(int): maximum number of requests in flight.
+            queue_size(int): maximum number of waiting requests.
+            timeout(float): maximum number of seconds a request waits in the queue.
+
+        """
+
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+
+    def acquire(self) -> bool:
+        """Admits a request, waiting in the queue if the limit has been reached.
+
+        Returns:
+            True if the request was admitted - release() must then be called once it finishes.
+            False if the queue is full or the request timed out waiting.
+
+        """
+
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue_size:
+                return False
+            self.waiting += 1
+            try:
+                admitted = self._condition.wait_for(lambda: self.active < self.limit,
+                                                    self.timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                return False
+            self.active += 1
+            return True
+
+
+    def release(self) -> None:
+        """Releases an admitted request, letting the next waiting request in."""
+
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+class Admission():
+    """
+    The AdmissionControllers for each route of the app, created from its config.
+
+    Attributes:
+        limits: a dict of per-route limits, by endpoint name.
+        default_limit: limit for routes not in limits.
+        queue_size: maximum number of waiting requests per route.
+        timeout: maximum number of seconds a request waits in the queue.
+        retry_after: seconds sent in the Retry-After header of rejected requests.
+
+    """
+
+
+    def __init__(self, limits: dict, default_limit: int, queue_size: int, timeout: float,
+                 retry_after: int) -> None:
+        """Inits Admission class.
+
+        Args:
+            limits(dict): per-route limits, by endpoint name eg {'main.main_search': 4}.
+            default_limit(int): limit for routes not in limits.
+            queue_size(int): maximum number of waiting requests per route.
+            timeout(float): maximum number of seconds a request waits in the queue.
+            retry_after(int): seconds sent in the Retry-After header of rejected requests.
+
+        """
+
+        self.limits = limits
+        self.default_limit = default_limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._controllers = {}
+        self._lock = threading.Lock()
+
+
+    def controller(self, endpoint: str) -> AdmissionController:
+        """Gets the AdmissionController for a route, creating it if necessary.
+
+        Args:
+            endpoint(str): endpoint name of the route, eg 'main.main_search'.
+
+        Returns:
+            The route's AdmissionController.
+
+        """
+
+        with self._lock:
+            if endpoint not in self._controllers:
+                limit = self.limits.get(endpoint, self.default_limit)
+                self._controllers[endpoint] = AdmissionController(limit, self.queue_size,
+                                                                  self.timeout)
+            return self._controllers[endpoint]
+
+
+def init_app(app: Flask) -> None:
+    """Sets up admission control for the app if ADMISSION_ENABLED is configured.
+
+    Args:
+        app(Flask): Flask application
+
+    """
+
+    if not app.config.get("ADMISSION_ENABLED"):
+        return
+    app.extensions["admission"] = Admission(
+        limits=app.config["ADMISSION_LIMITS"],
+        default_limit=app.config["ADMISSION_DEFAULT_LIMIT"],
+        queue_size=app.config["ADMISSION_QUEUE_SIZE"],
+        timeout=app.config["ADMISSION_TIMEOUT"],
+        retry_after=app.config["ADMISSION_RETRY_AFTER"])
+
+
+def limit_upstream(is_cached: Callable[[], bool] = None):
+    """Decorator that applies admission control to a view that makes Spotify API requests.
+
+    Args:
+        is_cached(Callable): called with no arguments during the request, returns True if the
+          request can be served without an api request. Such requests skip admission control.
+
+    Returns:
+        The decorator.
+
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            admission = current_app.extensions.get("admission")
+            if admission is None or (is_cached is not None and is_cached()):
+                return view(*args, **kwargs)
+
+            controller = admission.controller(request.endpoint)
+            if not controller.acquire():
+                return ("Service busy - please try again shortly.", 503,
+                        {"Retry-After": str(admission.retry_after)})
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release()
+        return wrapper
+    return decorator
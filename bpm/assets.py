@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Assets
+
+This module implements the static asset pipeline. The build step copies every static file to a
+content-hashed (fingerprinted) filename in static/dist, writes precompressed gzip variants of
+compressible files, and records the mapping in a manifest. When a manifest exists, the app's
+url_for('static', ...) returns the fingerprinted filenames, which are served with immutable
+one-year cache headers (and gzip encoding where the client accepts it).
+
+Typical usage example::
+
+    flask build-assets
+
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+import click
+from flask import Flask, request, send_from_directory
+
+
+BUILD_DIR = "dist"
+MANIFEST = "manifest.json"
+MAX_AGE = 31536000
+
+# file types worth precompressing - images are already compressed
+COMPRESSIBLE = (".css", ".js", ".svg", ".html", ".txt", ".json")
+
+
+def _fingerprint(path: str) -> str:
+    with open(path, "rb") as asset:
+        return hashlib.sha256(asset.read()).hexdigest()[:12]
+
+
+def build(static_folder: str) -> dict:
+    """Builds fingerprinted and precompressed copies of all static files.
+
+    Args:
+        static_folder(str): path of the app's static folder.
+
+    Returns:
+        manifest(dict): a dict mapping original filenames to fingerprinted filenames, both
+        relative to static_folder, eg {'style.css': 'dist/style.3f2a1b9c0d4e.css'}.
+
+    """
+
+    build_folder = os.path.join(static_folder, BUILD_DIR)
+    shutil.rmtree(build_folder, ignore_errors=True)
+    os.makedirs(build_folder)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [name for name in dirs if os.path.join(root, name) != build_folder]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            filename = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            stem, extension = os.path.splitext(filename)
+            fingerprinted = f"{BUILD_DIR}/{stem}.{_fingerprint(source)}{extension}"
+            target = os.path.join(static_folder, fingerprinted)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+
+            if extension in COMPRESSIBLE:
+                with open(source, "rb") as asset:
+                    compressed = gzip.compress(asset.read(), compresslevel=9, mtime=0)
+                if len(compressed) < os.path.getsize(source):
+                    with open(target + ".gz", "wb") as asset:
+                        asset.write(compressed)
+            manifest[filename] = fingerprinted
+
+    with open(os.path.join(build_folder, MANIFEST), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+def init_app(app: Flask) -> None:
+    """Registers the build-assets command and serves fingerprinted static files once built.
+
+    Overrides url_for('static', filename=...) to return fingerprinted filenames from the
+    manifest, and the static view to add immutable cache headers and serve gzip variants. Static
+    files are served as normal if there is no manifest (eg during development).
+
+    Args:
+        app(Flask): Flask application
+
+    """
+
+    @app.cli.command("build-assets")
+    def build_assets_command() -> None:
+        """Build fingerprinted and precompressed static files."""
+
+        for original, built in sorted(build(app.static_folder).items()):
+            click.echo(f"{original} -> {built}")
+
+    static_folder = app.static_folder
+    manifest_path = os.path.join(static_folder, BUILD_DIR, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    fingerprinted = set(manifest.values())
+    send_static_file = app.view_functions["static"]
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint: str, values: dict) -> None:
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    def send_fingerprinted_file(filename: str):
+        if filename not in fingerprinted:
+            return send_static_file(filename=filename)
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        compressed = os.path.exists(os.path.join(static_folder, filename + ".gz"))
+        if compressed and request.accept_encodings["gzip"]:
+            response = send_from_directory(static_folder, filename + ".gz", mimetype=mimetype)
+            response.headers["Content-Encoding"] = "gzip"
+        else:
+            response = send_from_directory(static_folder, filename, mimetype=mimetype)
+        if compressed:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = f"public, max-age={MAX_AGE}, immutable"
+        return response
+
+    app.view_functions["static"] = send_fingerprinted_file
+
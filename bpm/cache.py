@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Cache
+
+This module implements the TTLCache class, a bounded in-memory cache whose entries expire after
+a time-to-live. SpotifyAPI uses it to cache formatted tracks, audio features and search results.
+The entries of a cache can be exported with snapshot() and loaded into another cache (eg in a
+new process) with restore(), keeping their original expiry times.
+
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache():
+    """
+    A thread-safe cache with a maximum size and per-entry expiry.
+
+    The least recently used entry is evicted when the cache is full. Expiry times are wall clock
+    times (time.time()) so that they stay meaningful across processes.
+
+    Typical usage example::
+
+        cache = TTLCache(max_entries=1000, ttl=3600)
+        cache.set("XXXXyyyyYYYYxxxxZZZZab", track)
+        track = cache.get("XXXXyyyyYYYYxxxxZZZZab")
+
+    Attributes:
+        max_entries: maximum number of entries held.
+        ttl: number of seconds an entry is held for.
+
+    """
+
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600) -> None:
+        """Inits TTLCache class.
+
+        Args:
+            max_entries(int): maximum number of entries held.
+            ttl(float): number of seconds an entry is held for.
+
+        """
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.time()
+
+
+    def get(self, key, default=None):
+        """Gets a cached value.
+
+        Args:
+            key: the cache key.
+            default: returned if the key is not cached or has expired.
+
+        Returns:
+            The cached value, or default.
+
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+
+    def set(self, key, value) -> None:
+        """Caches a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: the cache key.
+            value: the value to cache.
+
+        """
+
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+    def snapshot(self) -> list:
+        """Exports the unexpired entries of the cache.
+
+        Returns:
+            entries(list): (key, expires, value) tuples, least recently used first, where expires
+            is the wall clock time the entry expires at.
+
+        """
+
+        now = time.time()
+        with self._lock:
+            return [(key, expires, value) for key, (expires, value) in self._entries.items()
+                    if expires > now]
+
+
+    def restore(self, entries: list) -> int:
+        """Loads entries exported by snapshot(), keeping their expiry times.
+
+        Entries that have expired since the snapshot was taken are skipped, and entries already
+        in the cache are kept.
+
+        Args:
+            entries(list): (key, expires, value) tuples from snapshot().
+
+        Returns:
+            The number of entries loaded.
+
+        """
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            # restored entries are less recently used than any already in the cache
+            for key, expires, value in reversed(entries):
+                if expires <= now or key in self._entries:
+                    continue
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key, last=False)
+                loaded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return loaded
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Cassette
+
+This module implements record/replay of the HTTP requests SpotifyAPI makes. In record mode,
+real requests are made and each response is saved to an on-disk cassette (a SQLite database of
+compressed response bodies indexed by request key) along with its latency. In replay mode, the
+recorded responses are served back without any network access, after the recorded latency
+multiplied by latency_scale, so that performance runs are deterministic and repeatable. Access
+tokens in recorded responses are replaced with a placeholder, so cassettes can be shared.
+
+Typical usage example::
+
+    cassette = Cassette("spotify.cassette", mode="record")
+    spotify = SpotifyAPI(client_id, client_secret, cassette=cassette)
+
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable
+from urllib.parse import urlencode
+
+from . import decoding
+
+
+MODES = ("record", "replay")
+
+# recorded in place of access tokens - replayed requests are never sent, so need no real token
+REDACTED_TOKEN = "REDACTED"
+
+
+def redact(content: bytes) -> bytes:
+    """Replaces the access token in a token endpoint response body with REDACTED_TOKEN.
+
+    Args:
+        content(bytes): raw response body.
+
+    Returns:
+        The response body without its access token, or unchanged if it doesn't have one.
+
+    """
+
+    if b'"access_token"' not in content:
+        return content
+    try:
+        data = decoding.loads(content)
+    except ValueError:
+        return content
+    if not isinstance(data, dict) or "access_token" not in data:
+        return content
+    data["access_token"] = REDACTED_TOKEN
+    return json.dumps(data).encode()
+
+
+class CassetteResponse():
+    """
+    A recorded response, with the parts of the requests.Response interface SpotifyAPI uses.
+
+    Attributes:
+        status_code: HTTP status code of the response.
+        content: raw response body.
+        elapsed: seconds the original request took.
+
+    """
+
+
+    def __init__(self, status_code: int, content: bytes, elapsed: float) -> None:
+        self.status_code = status_code
+        self.content = content
+        self.elapsed = elapsed
+
+
+    def json(self):
+        """Decodes the response body as JSON."""
+
+        return decoding.loads(self.content)
+
+
+class Cassette():
+    """
+    An on-disk store of recorded HTTP responses.
+
+    Attributes:
+        path: path of the cassette file.
+        mode: "record" to make real requests and save the responses, "replay" to serve saved
+          responses.
+        latency_scale: recorded latencies are multiplied by this when replaying - 0 disables
+          the delay.
+
+    """
+
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 1.0) -> None:
+        """Inits Cassette class and opens (or creates) the cassette file.
+
+        Args:
+            path(str): path of the cassette file.
+            mode(str): "record" or "replay".
+            latency_scale(float): multiplier for recorded latencies when replaying.
+
+        Raises:
+            Exception: Invalid cassette mode
+
+        """
+
+        if mode not in MODES:
+            raise Exception(f"Invalid cassette mode - use one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, status_code INTEGER, content BLOB, elapsed REAL)")
+        self._connection.commit()
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+    def close(self) -> None:
+        """Closes the cassette file."""
+
+        with self._lock:
+            self._connection.close()
+
+
+    @staticmethod
+    def key(method: str, url: str, data: dict = None) -> str:
+        """Creates the key a request is indexed by.
+
+        Headers are not part of the key, as they contain access tokens that change between runs.
+
+        Args:
+            method(str): HTTP method, eg "GET".
+            url(str): request url, including the query string.
+            data(dict): form data sent with the request.
+
+        Returns:
+            A hex digest identifying the request.
+
+        """
+
+        request = f"{method} {url}"
+        if data:
+            request += " " + urlencode(sorted(data.items()))
+        return hashlib.sha1(request.encode()).hexdigest()
+
+
+    def save(self, key: str, status_code: int, content: bytes, elapsed: float) -> None:
+        """Saves a response to the cassette, replacing any earlier response to the request.
+
+        Args:
+            key(str): request key - see key().
+            status_code(int): HTTP status code of the response.
+            content(bytes): raw response body.
+            elapsed(float): seconds the request took.
+
+        """
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, status_code, zlib.compress(content), elapsed))
+            self._connection.commit()
+
+
+    def load(self, key: str) -> CassetteResponse:
+        """Loads a recorded response from the cassette.
+
+        Args:
+            key(str): request key - see key().
+
+        Returns:
+            The recorded response, or None if the request has not been recorded.
+
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT status_code, content, elapsed FROM responses WHERE key = ?",
+                (key,)).fetchone()
+        if row is None:
+            return None
+        status_code, content, elapsed = row
+        return CassetteResponse(status_code, zlib.decompress(content), elapsed)
+
+
+    def request(self, method: str, url: str, send: Callable, data: dict = None):
+        """Records or replays a request, depending on the cassette mode.
+
+        Args:
+            method(str): HTTP method, eg "GET".
+            url(str): request url, including the query string.
+            send(Callable): called with no arguments to make the real request in record mode.
+            data(dict): form data sent with the request.
+
+        Returns:
+            The response - a requests.Response in record mode, a CassetteResponse in replay
+            mode.
+
+        Raises:
+            Exception: No recorded response for request
+
+        """
+
+        key = self.key(method, url, data)
+        if self.mode == "record":
+            start = time.perf_counter()
+            response = send()
+            self.save(key, response.status_code, redact(response.content),
+                      time.perf_counter() - start)
+            return response
+
+        response = self.load(key)
+        if response is None:
+            raise Exception(f"No recorded response for request: {method} {url}")
+        if self.latency_scale:
+            time.sleep(response.elapsed * self.latency_scale)
+        return response
+
+
+def from_env(environ: dict) -> Cassette:
+    """Creates a Cassette from SPOTIFY_CASSETTE* environment variables.
+
+    Args:
+        environ(dict): environment variables, eg os.environ.
+
+    Returns:
+        A Cassette if SPOTIFY_CASSETTE is set, otherwise None.
+
+    """
+
+    path = environ.get("SPOTIFY_CASSETTE")
+    if not path:
+        return None
+    return Cassette(path,
+                    mode=environ.get("SPOTIFY_CASSETTE_MODE", "replay"),
+                    latency_scale=float(environ.get("SPOTIFY_CASSETTE_LATENCY_SCALE", 1.0)))
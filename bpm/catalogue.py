@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+Catalogue
+
+This module implements the Catalogue class, a local SQLite store of every track the service has
+resolved (track id, name, artist, tempo and key), and streaming NDJSON/CSV export of it. Exports
+are generators that read the catalogue in small batches, so memory use stays flat however large
+the catalogue is. Every record carries a cursor; passing the last cursor of one export to the
+next returns only tracks resolved since. Tracks are recorded off the request path: enqueue()
+only adds them to a queue, which a background thread writes to the catalogue in batches.
+
+Typical usage example::
+
+    catalogue = Catalogue("catalogue.db")
+    for line in ndjson_lines(catalogue.export(min_tempo=120, max_tempo=130)):
+        print(line, end="")
+
+"""
+
+import atexit
+import csv
+import datetime
+import io
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+import click
+from flask import Flask
+
+from .track import Track, KEY_NAMES
+
+
+FIELDS = ("cursor", "track_id", "track_name", "artist", "tempo", "key", "last_seen")
+
+FORMATS = ("ndjson", "csv")
+
+# a warning is logged for the first dropped track, and then every this many
+DROPPED_LOG_EVERY = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class Catalogue():
+    """
+    A SQLite store of resolved tracks.
+
+    Attributes:
+        path: path of the SQLite database file.
+        batch_size: maximum number of queued tracks written in one transaction.
+        dropped: number of tracks not recorded because the queue was full.
+
+    """
+
+
+    def __init__(self, path: str, queue_size: int = 10000, batch_size: int = 500) -> None:
+        """Inits Catalogue class and creates the database if necessary.
+
+        Args:
+            path(str): path of the SQLite database file.
+            queue_size(int): maximum number of tracks waiting to be recorded - see enqueue().
+            batch_size(int): maximum number of queued tracks written in one transaction.
+
+        """
+
+        self.path = path
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._lock = threading.Lock()
+        # separate from _lock, which is held during writes, so enqueue() never waits on them
+        self._dropped_lock = threading.Lock()
+        self._queue = queue.Queue(queue_size)
+        self._writer = None
+        # one connection for all writes, shared by record() and the writer thread
+        self._connection = self._connect()
+        with self._lock:
+            # WAL lets exports read while other workers record tracks
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                "track_id TEXT PRIMARY KEY, track_name TEXT, artist TEXT, tempo INTEGER, "
+                "key_code INTEGER, last_seen REAL, seq INTEGER)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS tracks_seq ON tracks (seq)")
+            self._connection.commit()
+
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+
+
+    def __len__(self) -> int:
+        connection = self._connect()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+        finally:
+            connection.close()
+
+
+    def record(self, track: Track, seen: float = None) -> None:
+        """Records a resolved track, or updates it and its last seen time if already recorded.
+
+        Args:
+            track(Track): a track with name, artist, tempo and key, eg from get_track().
+            seen(float): unix time the track was seen, now if None.
+
+        """
+
+        self.record_many([(track, time.time() if seen is None else seen)])
+
+
+    def record_many(self, sightings: list) -> None:
+        """Records a batch of resolved tracks in one transaction.
+
+        Args:
+            sightings(list): (track, seen) tuples, where seen is the unix time the track was
+              seen. Only the last sighting of each track is recorded.
+
+        """
+
+        latest = {track.track_id: (track, seen) for track, seen in sightings}
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO tracks VALUES (?, ?, ?, ?, ?, ?, "
+                "(SELECT COALESCE(MAX(seq), 0) + 1 FROM tracks)) "
+                "ON CONFLICT (track_id) DO UPDATE SET track_name = excluded.track_name, "
+                "artist = excluded.artist, tempo = excluded.tempo, "
+                "key_code = excluded.key_code, last_seen = excluded.last_seen, "
+                "seq = excluded.seq",
+                [(track.track_id, track.track_name, track.artist, track.tempo, track.key_code,
+                  seen) for track, seen in latest.values()])
+
+
+    def enqueue(self, track: Track) -> None:
+        """Queues a track to be recorded by the background writer thread, without blocking.
+
+        The track is dropped (and counted in dropped) if the queue is full.
+
+        Args:
+            track(Track): a track with name, artist, tempo and key, eg from get_track().
+
+        """
+
+        try:
+            self._queue.put_nowait((track, time.time()))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if (dropped - 1) % DROPPED_LOG_EVERY == 0:
+                logger.warning("catalogue queue full - %d tracks not recorded in %s so far",
+                               dropped, self.path)
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_queued,
+                                                    name="bpm-catalogue", daemon=True)
+                    self._writer.start()
+
+
+    def flush(self) -> None:
+        """Waits until every queued track has been written."""
+
+        if self._writer is not None:
+            self._queue.join()
+
+
+    def _write_queued(self) -> None:
+        """Writes queued tracks in batches - run by the background writer thread."""
+
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.record_many(batch)
+            except Exception:
+                logger.exception("failed to record %d tracks in %s", len(batch), self.path)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+    def export(self, min_tempo: int = None, max_tempo: int = None, key: str = None,
+               since: float = None, cursor: int = 0, batch_size: int = 1000) -> Iterator[dict]:
+        """Exports recorded tracks, filtered on the database, in the order they were recorded.
+
+        The export covers the tracks recorded when it is called. Tracks recorded (or seen again)
+        while it is being read are left for the next incremental export, so no track is
+        exported twice and the export always ends.
+
+        Args:
+            min_tempo(int): only export tracks with at least this tempo.
+            max_tempo(int): only export tracks with at most this tempo.
+            key(str): only export tracks in this key, eg "E Major".
+            since(float): only export tracks last seen at or after this unix time.
+            cursor(int): only export tracks recorded after this cursor, from an earlier export.
+            batch_size(int): number of tracks read from the database at a time.
+
+        Returns:
+            A generator of dicts with the keys in FIELDS.
+
+        Raises:
+            Exception: Invalid key (raised straight away, before any records are read)
+
+        """
+
+        connection = self._connect()
+        try:
+            last_seq = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM tracks").fetchone()[0]
+        finally:
+            connection.close()
+
+        conditions = ["seq > ?", "seq <= ?"]
+        parameters = [last_seq]
+        if min_tempo is not None:
+            conditions.append("tempo >= ?")
+            parameters.append(min_tempo)
+        if max_tempo is not None:
+            conditions.append("tempo <= ?")
+            parameters.append(max_tempo)
+        if key is not None:
+            if key not in KEY_NAMES:
+                raise Exception(f"Invalid key: {key}")
+            conditions.append("key_code = ?")
+            parameters.append(KEY_NAMES.index(key))
+        if since is not None:
+            conditions.append("last_seen >= ?")
+            parameters.append(since)
+        query = ("SELECT seq, track_id, track_name, artist, tempo, key_code, last_seen "
+                 f"FROM tracks WHERE {' AND '.join(conditions)} ORDER BY seq LIMIT ?")
+        return self._read(query, parameters, cursor, batch_size)
+
+
+    def _read(self, query: str, parameters: list, cursor: int,
+              batch_size: int) -> Iterator[dict]:
+        """Reads export records in batches, paging through the catalogue by cursor."""
+
+        connection = self._connect()
+        try:
+            while True:
+                rows = connection.execute(query, [cursor, *parameters, batch_size]).fetchall()
+                for seq, track_id, track_name, artist, tempo, key_code, last_seen in rows:
+                    yield {"cursor": seq,
+                           "track_id": track_id,
+                           "track_name": track_name,
+                           "artist": artist,
+                           "tempo": tempo,
+                           "key": KEY_NAMES[key_code] if key_code is not None else None,
+                           "last_seen": datetime.datetime.fromtimestamp(
+                               last_seen, datetime.timezone.utc).isoformat()}
+                if len(rows) < batch_size:
+                    return
+                cursor = rows[-1][0]
+        finally:
+            connection.close()
+
+
+def ndjson_lines(records: Iterator[dict]) -> Iterator[str]:
+    """Formats exported records as newline delimited JSON, one line per record."""
+
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def csv_lines(records: Iterator[dict]) -> Iterator[str]:
+    """Formats exported records as CSV, starting with a header line."""
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def lines(records: Iterator[dict], export_format: str = "ndjson") -> Iterator[str]:
+    """Formats exported records as NDJSON or CSV.
+
+    Args:
+        records(Iterator): records from Catalogue.export().
+        export_format(str): "ndjson" or "csv".
+
+    Returns:
+        A generator of lines of text.
+
+    Raises:
+        Exception: Invalid export format
+
+    """
+
+    if export_format == "ndjson":
+        return ndjson_lines(records)
+    if export_format == "csv":
+        return csv_lines(records)
+    raise Exception(f"Invalid export format - use one of {', '.join(FORMATS)}")
+
+
+def init_app(app: Flask, client) -> None:
+    """Records the tracks resolved by the client in CATALOGUE_PATH, if configured.
+
+    Also registers the export-tracks command.
+
+    Args:
+        app(Flask): Flask application
+        client(SpotifyAPI): client whose resolved tracks are recorded, or None.
+
+    """
+
+    @app.cli.command("export-tracks")
+    @click.option("--format", "export_format", type=click.Choice(FORMATS), default="ndjson")
+    @click.option("--min-tempo", type=int, help="Minimum tempo in bpm.")
+    @click.option("--max-tempo", type=int, help="Maximum tempo in bpm.")
+    @click.option("--key", help='Musical key, eg "E Major".')
+    @click.option("--since", type=float, help="Only tracks last seen since this unix time.")
+    @click.option("--cursor", type=int, default=0, help="Cursor from an earlier export.")
+    @click.option("--output", type=click.File("w"), default="-")
+    def export_tracks_command(export_format, min_tempo, max_tempo, key, since, cursor, output):
+        """Export the catalogue of resolved tracks as NDJSON or CSV."""
+
+        catalogue = app.extensions.get("catalogue")
+        if catalogue is None:
+            raise click.ClickException("CATALOGUE_PATH is not configured.")
+        records = catalogue.export(min_tempo=min_tempo, max_tempo=max_tempo, key=key,
+                                   since=since, cursor=cursor)
+        for line in lines(records, export_format):
+            output.write(line)
+
+    path = app.config.get("CATALOGUE_PATH")
+    if not path:
+        return
+    catalogue = Catalogue(path)
+    app.extensions["catalogue"] = catalogue
+    atexit.register(catalogue.flush)
+    if client is not None:
+        client.catalogue = catalogue
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Decoding
+
+This module decodes the JSON responses returned by the Spotify API. It uses orjson when it is
+installed, falling back to the standard library json module otherwise. It can also prune large
+fields that BPM never uses (such as the available_markets arrays attached to every track and
+album) from the raw response before decoding, so that their objects are never built.
+
+"""
+
+import json
+
+from .profiling import traced
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+
+# fields that are discarded from responses decoded with loads_selective()
+DISCARDED_FIELDS = ("available_markets",)
+
+_WHITESPACE = b" \t\r\n"
+
+
+@traced("json_decode")
+def loads(content: bytes):
+    """Decodes a JSON response body using the fastest available parser.
+
+    Args:
+        content(bytes): raw JSON response body.
+
+    Returns:
+        The decoded JSON data, eg a dict.
+
+    """
+
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _skip_whitespace(content: bytes, index: int) -> int:
+    while index < len(content) and content[index] in _WHITESPACE:
+        index += 1
+    return index
+
+
+def _strip_trailing_comma(part: bytes) -> bytes:
+    stripped = part.rstrip(_WHITESPACE)
+    if stripped.endswith(b","):
+        return stripped[:-1]
+    return part
+
+
+@traced("json_prune")
+def prune(content: bytes, fields: tuple = DISCARDED_FIELDS) -> bytes:
+    """Removes array fields from a raw JSON response body without decoding it.
+
+    Only fields whose value is a flat array (ie an array with no nested arrays) are removed;
+    any other occurrence of a field name is left untouched.
+
+    Args:
+        content(bytes): raw JSON response body.
+        fields(tuple): names of the array fields to remove.
+
+    Returns:
+        The JSON response body with the fields removed.
+
+    """
+
+    for field in fields:
+        name = b'"' + field.encode() + b'"'
+        parts = []
+        start = 0
+        search_from = 0
+        while True:
+            found = content.find(name, search_from)
+            if found < 0:
+                break
+            search_from = found + len(name)
+            colon = _skip_whitespace(content, search_from)
+            if content[colon:colon + 1] != b":":
+                continue
+            bracket = _skip_whitespace(content, colon + 1)
+            if content[bracket:bracket + 1] != b"[":
+                continue
+            end = content.find(b"]", bracket)
+            if end < 0 or content.find(b"[", bracket + 1, end) >= 0:
+                continue
+            end = _skip_whitespace(content, end + 1)
+            parts.append(content[start:found])
+            if content[end:end + 1] == b",":
+                end = _skip_whitespace(content, end + 1)
+            else:
+                # last field of the object, so drop the comma before it instead
+                parts[-1] = _strip_trailing_comma(parts[-1])
+            start = search_from = end
+        if parts:
+            parts.append(content[start:])
+            content = b"".join(parts)
+    return content
+
+
+def loads_selective(content: bytes, fields: tuple = DISCARDED_FIELDS):
+    """Decodes a JSON response body, discarding fields that BPM never uses.
+
+    Args:
+        content(bytes): raw JSON response body.
+        fields(tuple): names of the array fields to discard - see prune().
+
+    Returns:
+        The decoded JSON data without the discarded fields.
+
+    """
+
+    return loads(prune(content, fields))
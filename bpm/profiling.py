@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling
+
+This module implements on-demand request profiling. Functions decorated with traced() record a
+span (name, start and end time) in the timeline of the request being profiled, and do nothing
+else if the request is not being profiled. Profiling is enabled by the PROFILING_ENABLED config
+value, and then applies to requests that send the PROFILING_HEADER header or are sampled at
+PROFILING_SAMPLE_RATE. Profiled responses carry the timeline in a Server-Timing header, and
+requests that send the PROFILING_SECRET as the header value also have a full cProfile dump saved
+to PROFILING_DIR, which keeps only the PROFILING_MAX_DUMPS most recent dumps.
+
+Typical usage example::
+
+    @traced("get_resource")
+    def _fetch_resource(self, lookup_id):
+        ...
+
+"""
+
+import contextvars
+import cProfile
+import functools
+import glob
+import hmac
+import os
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, g, request
+
+
+# timeline of the request being profiled - None when the request is not being profiled
+_timeline = contextvars.ContextVar("bpm_profiling_timeline", default=None)
+
+# held while a cProfile dump is being recorded - only one profiler can be active per process, and
+# from Python 3.12 it records every thread, so overlapping requests skip the dump
+_profiler_lock = threading.Lock()
+
+
+def traced(name: str):
+    """Decorator that records a span in the current request's timeline when it is profiled.
+
+    Args:
+        name(str): name of the span, eg "get_resource".
+
+    Returns:
+        The decorator.
+
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timeline = _timeline.get()
+            if timeline is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timeline.append((name, start, time.perf_counter()))
+        return wrapper
+    return decorator
+
+
+def server_timing(timeline: list, start: float, end: float) -> str:
+    """Formats a timeline as a Server-Timing header value.
+
+    Args:
+        timeline(list): (name, start, end) spans recorded by traced().
+        start(float): start time of the request.
+        end(float): end time of the request.
+
+    Returns:
+        A header value such as 'get_resource;dur=120.5;desc="@3.1", total;dur=130.2', where
+        durations and start offsets (desc) are in milliseconds.
+
+    """
+
+    metrics = [f"{name};dur={(span_end - span_start) * 1000:.1f};"
+               f"desc=\"@{(span_start - start) * 1000:.1f}\""
+               for name, span_start, span_end in sorted(timeline, key=lambda span: span[1])]
+    metrics.append(f"total;dur={(end - start) * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+def remove_old_dumps(directory: str, max_dumps: int) -> int:
+    """Removes the oldest cProfile dumps so that at most max_dumps are kept.
+
+    Args:
+        directory(str): directory the dumps are saved in.
+        max_dumps(int): number of dumps to keep.
+
+    Returns:
+        The number of dumps removed.
+
+    """
+
+    dumps = sorted(glob.glob(os.path.join(directory, "*.prof")), key=os.path.getmtime)
+    removed = dumps[:max(len(dumps) - max_dumps, 0)]
+    for path in removed:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # already removed by another worker
+            pass
+    return len(removed)
+
+
+def init_app(app: Flask) -> None:
+    """Profiles requests if PROFILING_ENABLED is configured. Does nothing otherwise.
+
+    Args:
+        app(Flask): Flask application
+
+    """
+
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+
+    header = app.config["PROFILING_HEADER"]
+    sample_rate = app.config["PROFILING_SAMPLE_RATE"]
+    directory = app.config["PROFILING_DIR"]
+    secret = app.config.get("PROFILING_SECRET")
+    max_dumps = app.config.get("PROFILING_MAX_DUMPS", 100)
+
+    @app.before_request
+    def start_profile() -> None:
+        requested = request.headers.get(header)
+        if requested is None and random.random() >= sample_rate:
+            return
+        g.profile_start = time.perf_counter()
+        g.profile_token = _timeline.set([])
+        g.profiler = None
+        if (directory and secret and requested is not None
+                and hmac.compare_digest(requested.encode(), secret.encode())):
+            if not _profiler_lock.acquire(blocking=False):
+                app.logger.info("skipping cProfile dump for %s - another request is being "
+                                "profiled", request.path)
+                return
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # another profiling tool is active in the process
+                _profiler_lock.release()
+                app.logger.warning("skipping cProfile dump for %s", request.path, exc_info=True)
+                return
+            g.profiler = profiler
+
+    @app.after_request
+    def finish_profile(response):
+        if "profile_token" not in g:
+            return response
+        end = time.perf_counter()
+        if g.profiler is not None:
+            profiler = g.profiler
+            g.profiler = None
+            profiler.disable()
+            _profiler_lock.release()
+            os.makedirs(directory, exist_ok=True)
+            endpoint = (request.endpoint or "unknown").replace(".", "-")
+            filename = f"{int(time.time())}-{endpoint}-{uuid.uuid4().hex}.prof"
+            path = os.path.join(directory, filename)
+            profiler.dump_stats(path)
+            remove_old_dumps(directory, max_dumps)
+            app.logger.info("cProfile dump for %s saved to %s", request.path, path)
+        timing = server_timing(_timeline.get(), g.profile_start, end)
+        response.headers["Server-Timing"] = timing
+        app.logger.info("profile %s %s: %s", request.method, request.path, timing)
+        return response
+
+    @app.teardown_request
+    def reset_profile(exception=None) -> None:
+        token = g.pop("profile_token", None)
+        if token is not None:
+            _timeline.reset(token)
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            # the request failed before finish_profile()
+            profiler.disable()
+            _profiler_lock.release()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshot
+
+This module saves the SpotifyAPI caches to a compact snapshot file and loads them back, so that
+new processes (eg after a deploy or a gunicorn worker restart) start with a warm cache rather
+than sending a burst of requests to the Spotify API. Snapshots are pickled and zlib compressed,
+so CACHE_SNAPSHOT_PATH must only be writable by the application. Each save is merged with the
+snapshot already on disk, so the workers of a multi-process server add to one shared snapshot
+rather than replacing each other's entries.
+
+Typical usage example::
+
+    save(spotify, "/var/cache/bpm/snapshot")
+    load(spotify, "/var/cache/bpm/snapshot")
+
+"""
+
+import atexit
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from flask import Flask
+
+from .spotify import SpotifyAPI
+from .track import Track
+
+
+VERSION = 2
+
+# snapshots made with a different Track field layout are discarded rather than loaded into the
+# wrong fields
+SCHEMA = (VERSION, Track.__slots__)
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _locked(path: str):
+    """Holds an exclusive lock on a snapshot file while it is merged and replaced."""
+
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read(path: str) -> dict:
+    """Reads a snapshot file.
+
+    Returns:
+        The cache entries by cache name - see SpotifyAPI.snapshot().
+
+    Raises:
+        Exception: Incompatible snapshot (or any error reading or unpickling the file)
+
+    """
+
+    with open(path, "rb") as snapshot_file:
+        schema, snapshot = pickle.loads(zlib.decompress(snapshot_file.read()))
+    if schema != SCHEMA:
+        raise Exception(f"Incompatible snapshot schema: {schema}")
+    return snapshot
+
+
+def merge(old: dict, new: dict, max_entries: int) -> dict:
+    """Merges two snapshots, keeping the entry that expires last for each key.
+
+    Args:
+        old(dict): cache entries by cache name, eg from the snapshot file.
+        new(dict): cache entries by cache name, eg from this process - treated as more recently
+          used than old entries.
+        max_entries(int): maximum number of entries kept per cache, most recently used first.
+
+    Returns:
+        The merged cache entries by cache name.
+
+    """
+
+    now = time.time()
+    merged = {}
+    for name in set(old) | set(new):
+        entries = OrderedDict()
+        for key, expires, value in old.get(name, []) + new.get(name, []):
+            if expires <= now or (key in entries and entries[key][0] >= expires):
+                continue
+            entries[key] = (expires, value)
+            entries.move_to_end(key)
+        merged[name] = [(key, expires, value)
+                        for key, (expires, value) in list(entries.items())[-max_entries:]]
+    return merged
+
+
+def save(client: SpotifyAPI, path: str) -> None:
+    """Saves a snapshot of the client's caches, merged with the snapshot already saved.
+
+    The snapshot is written to a temporary file and then moved into place, so concurrent
+    readers never see a partial snapshot, and workers saving at the same time take turns so
+    that none of their entries are lost.
+
+    Args:
+        client(SpotifyAPI): client whose caches are saved.
+        path(str): path of the snapshot file.
+
+    """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with _locked(path):
+        current = client.snapshot()
+        try:
+            current = merge(_read(path), current, client.track_cache.max_entries)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.warning("replacing unreadable cache snapshot %s", path, exc_info=True)
+        data = zlib.compress(pickle.dumps((SCHEMA, current), pickle.HIGHEST_PROTOCOL))
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot")
+        try:
+            with os.fdopen(descriptor, "wb") as snapshot_file:
+                snapshot_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def load(client: SpotifyAPI, path: str) -> int:
+    """Loads a snapshot into the client's caches, keeping the original expiry times.
+
+    Args:
+        client(SpotifyAPI): client whose caches are loaded.
+        path(str): path of the snapshot file.
+
+    Returns:
+        The number of cache entries loaded. 0 if there is no snapshot, or it is unreadable or
+        from an incompatible version (eg pickled by an earlier deploy) - the error is logged.
+
+    """
+
+    try:
+        return client.restore(_read(path))
+    except FileNotFoundError:
+        return 0
+    except Exception:
+        logger.warning("ignoring unreadable cache snapshot %s", path, exc_info=True)
+        return 0
+
+
+def init_app(app: Flask, client: SpotifyAPI) -> None:
+    """Warms up the client's caches from CACHE_SNAPSHOT_PATH, if configured.
+
+    Also saves a snapshot when the process exits (eg on a graceful gunicorn worker shutdown),
+    and every CACHE_SNAPSHOT_INTERVAL seconds if that is configured.
+
+    Args:
+        app(Flask): Flask application
+        client(SpotifyAPI): client whose caches are saved and loaded. Nothing is done if None.
+
+    """
+
+    path = app.config.get("CACHE_SNAPSHOT_PATH")
+    if not path or client is None:
+        return
+
+    loaded = load(client, path)
+    app.logger.info("loaded %d cache entries from snapshot %s", loaded, path)
+
+    atexit.register(save, client, path)
+
+    interval = app.config.get("CACHE_SNAPSHOT_INTERVAL")
+    if interval:
+        def save_periodically() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    save(client, path)
+                except Exception:
+                    app.logger.exception("failed to save cache snapshot to %s", path)
+
+        threading.Thread(target=save_periodically, name="bpm-cache-snapshot",
+                         daemon=True).start()
@@ -13,6 +13,12 @@ import datetime
 from urllib.parse import urlencode
 import requests
 
+from . import decoding
+from .cache import TTLCache
+from .cassette import Cassette
+from .profiling import traced
+from .track import Track, KEY_NAMES, encode_key, format_images
+
 
 class SpotifyAPI():
     """
@@ -34,17 +40,28 @@ class SpotifyAPI():
         access_token_expires: time at which current access_token expires.
         access_token_did_expire: expresses whether access_token has expired or not.
         token_url: url for obtaining spotify access token.
+        track_cache: cache of formatted tracks from get_track(), by track id.
+        features_cache: cache of key & tempo data from get_musical_data(), by track id.
+        search_cache: cache of search results from get_tracks(), by query.
+        cassette: a Cassette that http requests are recorded to or replayed from, or None to
+          make requests as normal.
+        catalogue: a Catalogue that tracks returned by get_track() (including from the cache) are
+          queued to be recorded in, or None.
 
     """
 
 
-    def __init__(self, client_id: str, client_secret: str) -> None:
+    def __init__(self, client_id: str, client_secret: str, cache_size: int = 10000,
+                 cache_ttl: float = 3600, cassette: Cassette = None) -> None:
         """Inits SpotifyAPI class and performs authentication.
 
         Args:
             client_id (str): spotify client id for the application.
             client_secret (str): spotify client secret for the application, relates to specific
               client id.
+            cache_size (int): maximum number of entries in each cache.
+            cache_ttl (float): number of seconds formatted data is cached for.
+            cassette (Cassette): records or replays http requests - see bpm.cassette.
         """
         self.client_id = client_id
         self.client_secret = client_secret
@@ -52,9 +69,65 @@ class SpotifyAPI():
         self.access_token_expires = datetime.datetime.now()
         self.access_token_did_expire = True
         self.token_url = "https://accounts.spotify.com/api/token"
+        self.track_cache = TTLCache(cache_size, cache_ttl)
+        self.features_cache = TTLCache(cache_size, cache_ttl)
+        self.search_cache = TTLCache(cache_size, cache_ttl)
+        self.cassette = cassette
+        self.catalogue = None
         self._perform_auth()
 
 
+    def set_cache_limits(self, cache_size: int, cache_ttl: float) -> None:
+        """Sets the maximum size and time-to-live of each cache, eg from app config.
+
+        Args:
+            cache_size (int): maximum number of entries in each cache.
+            cache_ttl (float): number of seconds formatted data is cached for.
+
+        """
+
+        for cache in (self.track_cache, self.features_cache, self.search_cache):
+            cache.max_entries = cache_size
+            cache.ttl = cache_ttl
+
+
+    def _get(self, url: str, headers: dict):
+        """Makes a GET request, through the cassette if there is one.
+
+        Args:
+            url(str): request url, including the query string.
+            headers(dict): request headers.
+
+        Returns:
+            The response.
+
+        """
+
+        if self.cassette is None:
+            return requests.get(url, headers=headers)
+        return self.cassette.request("GET", url, lambda: requests.get(url, headers=headers))
+
+
+    def _post(self, url: str, data: dict, headers: dict):
+        """Makes a POST request, through the cassette if there is one.
+
+        Args:
+            url(str): request url.
+            data(dict): form data.
+            headers(dict): request headers.
+
+        Returns:
+            The response.
+
+        """
+
+        if self.cassette is None:
+            return requests.post(url, data=data, headers=headers)
+        return self.cassette.request("POST", url,
+                                     lambda: requests.post(url, data=data, headers=headers),
+                                     data=data)
+
+
     def _get_client_credentials(self) -> str:
         """Combines client_id and client_secret to create a single base64 encoded string.
 
@@ -103,6 +176,7 @@ class SpotifyAPI():
         return {"grant_type": "client_credentials"}
 
 
+    @traced("_get_access_token")
     def _get_access_token(self) -> str:
         """Obtains and returns a valid access token.
 
@@ -138,8 +212,7 @@ class SpotifyAPI():
         token_data = self._get_token_data()
         token_headers = self._get_token_headers()
 
-        result = requests.post(
-            token_url, data=token_data, headers=token_headers)
+        result = self._post(token_url, data=token_data, headers=token_headers)
         if result.status_code not in range(200, 299):
             raise Exception(
                 "Authentication failed - ensure client credentials are correct.")
@@ -168,6 +241,29 @@ class SpotifyAPI():
         return headers
 
 
+    @traced("get_resource")
+    def _fetch_resource(self, lookup_id: str, resource_type: str = "tracks",
+                        version: str = "v1") -> bytes:
+        """Makes an api request for resources from spotify and returns the raw response body.
+
+        Args:
+            lookup_id(str): a string of 22 alphanumeric characters related to a specific object.
+            resource_type(str): type of resource that relates to lookup_id.
+            version(str): a string relating to version of spotify api.
+
+        Returns:
+            content(bytes): the raw JSON response body. If request is unsuccessful, returns None.
+
+        """
+
+        endpoint = f"https://api.spotify.com/{version}/{resource_type}/{lookup_id}"
+        headers = self._get_resource_headers()
+        result = self._get(endpoint, headers=headers)
+        if result.status_code not in range(200, 299):
+            return None
+        return result.content
+
+
     def get_resource(self, lookup_id: str, resource_type: str = "tracks",
                      version: str = "v1") -> dict:
         """Makes an api request for resources from spotify.
@@ -189,12 +285,10 @@ class SpotifyAPI():
 
         """
 
-        endpoint = f"https://api.spotify.com/{version}/{resource_type}/{lookup_id}"
-        headers = self._get_resource_headers()
-        result = requests.get(endpoint, headers=headers)
-        if result.status_code not in range(200, 299):
+        content = self._fetch_resource(lookup_id, resource_type, version)
+        if content is None:
             return {}
-        return result.json()
+        return decoding.loads(content)
 
 
     def get_artist(self, lookup_id: str) -> dict:
@@ -229,13 +323,13 @@ class SpotifyAPI():
         return self.get_resource(lookup_id, resource_type="albums")
 
 
-    def get_track(self, lookup_id: str) -> dict:
+    def get_track(self, lookup_id: str) -> Track:
         """Gets track data from spotify based on lookup_id
 
         Typical usage example::
 
             track = SpotifyAPI.get_track("XXXXyyyyYYYYxxxxZZZZab")
-            print(track)
+            print(track.to_dict())
             {'artist': _,
             'image_url': _,
             'key': _,
@@ -249,23 +343,48 @@ class SpotifyAPI():
               usually obtained from SpotifyAPI.search().
 
         Returns:
-            A dict containing formatted data related to the track. If request is
-              unsuccessful, returns an empty dict.
+            A Track record containing formatted data related to the track. If request is
+              unsuccessful, returns None.
 
         """
 
-        track_data = self.get_resource(lookup_id, resource_type="tracks")
+        track = self.track_cache.get(lookup_id)
+        if track is not None:
+            if self.catalogue is not None:
+                # cache hits are sightings too, so the catalogue's last seen times stay current
+                self.catalogue.enqueue(track)
+            return track
+
+        content = self._fetch_resource(lookup_id, resource_type="tracks")
+        track_data = decoding.loads_selective(content) if content is not None else {}
         track = self.get_musical_data(lookup_id)
         try:
-            track["track_name"] = track_data['name']
-            track["artist"] = track_data['artists'][0]['name']
-            track["track_url"] = track_data['external_urls']['spotify']
-            track["image_url"] = track_data['album']['images'][0]['url']
+            track = track.replace(track_name=track_data['name'],
+                                  artist=track_data['artists'][0]['name'],
+                                  track_url=track_data['external_urls']['spotify'],
+                                  images=format_images(track_data['album']['images']))
         except:
-            return {}
+            return None
+        self.track_cache.set(lookup_id, track)
+        if self.catalogue is not None:
+            self.catalogue.enqueue(track)
         return track
 
 
+    def is_track_cached(self, lookup_id: str) -> bool:
+        """Checks whether get_track() can be served from the cache, without an api request.
+
+        Args:
+            lookup_id(str): a string of 22 alphanumeric characters related to specific track.
+
+        Returns:
+            True if the formatted track is cached.
+
+        """
+
+        return lookup_id in self.track_cache
+
+
     def _get_track_features(self, lookup_id: str) -> dict:
         """Gets audio features of track from spotify based on lookup_id
 
@@ -282,23 +401,18 @@ class SpotifyAPI():
         return self.get_resource(lookup_id, resource_type="audio-features")
 
 
-    def search(self, query: dict = None, search_type: str = "artist",
-               market_type: str = "GB") -> dict:
-        """Makes an api request for search data from spotify.
-
-        Retrieves JSON data related to search request and returns as a dict of
-        unaltered data.
+    @traced("search")
+    def _fetch_search(self, query: dict = None, search_type: str = "artist",
+                      market_type: str = "GB") -> bytes:
+        """Makes an api request for search data from spotify and returns the raw response body.
 
         Args:
             query(dict): the search query as a dict of parameters such as {'track': '<song_title>'}
-            search_type(str): the type of search to be conducted such as for a 'track', 'artists',
-              'albums' etc.
-            market_type(str): a string relating to market the searchable object is available in;
-              "GB", "US" etc.
+            search_type(str): the type of search to be conducted.
+            market_type(str): a string relating to market the searchable object is available in.
 
         Returns:
-            r.json() (dict): a dict containing unaltered data related to the search request. If
-              request is unsuccessful, returns an empty dict.
+            content(bytes): the raw JSON response body. If request is unsuccessful, returns None.
 
         Raises:
             Exception: A query is required.
@@ -317,24 +431,53 @@ class SpotifyAPI():
         lookup_url = f"https://api.spotify.com/v1/search?{query_params}"
         headers = self._get_resource_headers()
 
-        result = requests.get(lookup_url, headers=headers)
+        result = self._get(lookup_url, headers=headers)
         print(result.status_code)
         if not result.status_code in range(200, 299):
+            return None
+        return result.content
+
+
+    def search(self, query: dict = None, search_type: str = "artist",
+               market_type: str = "GB") -> dict:
+        """Makes an api request for search data from spotify.
+
+        Retrieves JSON data related to search request and returns as a dict of
+        unaltered data.
+
+        Args:
+            query(dict): the search query as a dict of parameters such as {'track': '<song_title>'}
+            search_type(str): the type of search to be conducted such as for a 'track', 'artists',
+              'albums' etc.
+            market_type(str): a string relating to market the searchable object is available in;
+              "GB", "US" etc.
+
+        Returns:
+            r.json() (dict): a dict containing unaltered data related to the search request. If
+              request is unsuccessful, returns an empty dict.
+
+        Raises:
+            Exception: A query is required.
+
+        """
+
+        content = self._fetch_search(query, search_type, market_type)
+        if content is None:
             return {}
-        return result.json()
+        return decoding.loads(content)
 
 
     def get_tracks(self, query: dict = None) -> list:
         """Gets tracks from an api search request
 
-        Retrieves JSON data related to search request and returns as a formatted list of dicts for
-        easy lookup and manipulation.
+        Retrieves JSON data related to search request and returns as a formatted list of Track
+        records for easy lookup and manipulation.
 
         Typical usage Example::
 
             results = SpotifyAPI.get_tracks({'track': 'money'})
             first_result = results[0]
-            print(first_result)
+            print(first_result.to_dict())
             {'track_id': _,
             'track_name: _,
             'artist': _,
@@ -345,35 +488,95 @@ class SpotifyAPI():
             query(dict): the search query as a dict of parameters such as {'track': '<song_title>'}
 
         Returns:
-            tracks (list): a list of dicts containing formatted track data. See example above.
+            tracks (list): a list of Track records containing formatted track data. See example
+              above.
 
         Raises:
             Exception: Invalid search, no data found
 
         """
 
-        json_data = self.search(query, "track")
+        cache_key = self._search_cache_key(query)
+        tracks = self.search_cache.get(cache_key)
+        if tracks is not None:
+            return tracks
+
+        content = self._fetch_search(query, "track")
         tracks = []
         try:
-            tracks = [{'track_id': i['id'],
-                       'track_name': i['name'],
-                       'artist': i['artists'][0]['name'],
-                       'track_url': i['external_urls']['spotify'],
-                       'image_url': i['album']['images'][0]['url']
-                       } for i in json_data['tracks']['items']]
+            json_data = decoding.loads_selective(content) if content is not None else {}
+            tracks = [Track(i['id'],
+                            track_name=i['name'],
+                            artist=i['artists'][0]['name'],
+                            track_url=i['external_urls']['spotify'],
+                            images=format_images(i['album']['images'])
+                            ) for i in json_data['tracks']['items']]
+            self.search_cache.set(cache_key, tracks)
         except:
             raise Exception("Invalid search, no data found")
         finally:
             return tracks
 
 
-    def get_musical_data(self, track_id: str) -> dict:
+    def snapshot(self) -> dict:
+        """Exports the unexpired entries of the caches, eg to warm up a new process.
+
+        Returns:
+            A dict of cache entries by cache name - see TTLCache.snapshot().
+
+        """
+
+        return {"tracks": self.track_cache.snapshot(),
+                "features": self.features_cache.snapshot(),
+                "searches": self.search_cache.snapshot()}
+
+
+    def restore(self, snapshot: dict) -> int:
+        """Loads cache entries exported by snapshot(), keeping their expiry times.
+
+        Args:
+            snapshot(dict): cache entries by cache name, from snapshot().
+
+        Returns:
+            The number of entries loaded.
+
+        """
+
+        return (self.track_cache.restore(snapshot.get("tracks", []))
+                + self.features_cache.restore(snapshot.get("features", []))
+                + self.search_cache.restore(snapshot.get("searches", [])))
+
+
+    @staticmethod
+    def _search_cache_key(query: dict) -> tuple:
+        """Creates a search_cache key for a query - a tuple of its sorted items."""
+
+        if not query:
+            return ()
+        return tuple(sorted(query.items()))
+
+
+    def is_search_cached(self, query: dict) -> bool:
+        """Checks whether get_tracks() can be served from the cache, without an api request.
+
+        Args:
+            query(dict): the search query as a dict of parameters such as {'track': '<song_title>'}
+
+        Returns:
+            True if the search results are cached.
+
+        """
+
+        return self._search_cache_key(query) in self.search_cache
+
+
+    def get_musical_data(self, track_id: str) -> Track:
         """Gets key and tempo info related to track
 
         Typical usage example::
 
             results = SpotifyAPI.get_musical_data("XXXXyyyyYYYYxxxxZZZZab")
-            print(results)
+            print(results.to_dict())
             {'track_id': 'XXXXyyyyYYYYxxxxZZZZab',
             'key': 'B Minor',
             'tempo': 120}
@@ -383,20 +586,23 @@ class SpotifyAPI():
               usually obtained from SpotifyAPI.search().
 
         Returns:
-            musical_data(dict): a dict containing formatted key & tempo information.
+            musical_data(Track): a Track record containing key & tempo information.
 
         Raises:
             Exception: No data found - check track_id
 
         """
 
+        musical_data = self.features_cache.get(track_id)
+        if musical_data is not None:
+            return musical_data
+
         try:
             track_data = self._get_track_features(track_id)
-            key = self.key_convert(track_data.get('key'), track_data.get('mode'))
+            key_code = encode_key(track_data.get('key'), track_data.get('mode'))
             tempo = int(track_data.get('tempo'))
-            musical_data = {"track_id": track_id,
-                            "key": key,
-                            "tempo": tempo}
+            musical_data = Track(track_id, key_code=key_code, tempo=tempo)
+            self.features_cache.set(track_id, musical_data)
             return musical_data
         except:
             raise Exception("No data found - check track_id")
@@ -415,15 +621,4 @@ class SpotifyAPI():
 
         """
 
-        if key < 0 or key > 11:
-            return "No Key Available"
-
-        keys = {0: "C", 1: "Db", 2: "D", 3: "Eb",
-                4: "E", 5: "F", 6: "Gb", 7: "G",
-                8: "Ab", 9: "A", 10: "Bb", 11: "B"}
-
-        if mode == 1:
-            return f"{keys[key]} Major"
-        if mode == 0:
-            return f"{keys[key]} Minor"
-        return keys[key]
\ No newline at end of file
+        return KEY_NAMES[encode_key(key, mode)]
\ No newline at end of file
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Suggest
+
+This module implements the PrefixCache class used by the search-as-you-type suggestion route.
+Recent queries and their results are held in an in-memory prefix trie, so suggestions for
+prefixes that have been seen before are served without a request to the Spotify API.
+
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class _Node():
+    """A node of the prefix trie - one per character of a cached prefix."""
+
+    __slots__ = ("children", "results")
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.results = None
+
+
+class PrefixCache():
+    """
+    A bounded prefix trie of search queries and their results.
+
+    Only a limited number of prefixes keep their results - the least recently used prefix is
+    evicted (and its trie nodes pruned) when the limit is reached, so memory use stays bounded
+    while popular prefixes stay cached. Requests to the Spotify API are debounced per client:
+    if a client has made an upstream request too recently, suggestions are served from the
+    longest cached prefix of its query instead.
+
+    Typical usage example::
+
+        suggestions = PrefixCache(max_prefixes=10000)
+        tracks = suggestions.suggest("mon", client="127.0.0.1",
+                                     fetch=lambda prefix: spotify.get_tracks({"track": prefix}))
+
+    Attributes:
+        max_prefixes: maximum number of prefixes with cached results.
+        max_results: maximum number of results cached (and suggested) per prefix.
+        min_length: shortest prefix that suggestions are made for.
+        max_length: longest prefix cached - longer queries are truncated, so that one query
+          can't add an unbounded number of trie nodes.
+        debounce: minimum number of seconds between upstream requests for each client.
+        max_clients: maximum number of clients tracked for debouncing.
+
+    """
+
+
+    def __init__(self, max_prefixes: int = 10000, max_results: int = 10, min_length: int = 2,
+                 max_length: int = 64, debounce: float = 0.3, max_clients: int = 10000) -> None:
+        """Inits PrefixCache class.
+
+        Args:
+            max_prefixes(int): maximum number of prefixes with cached results.
+            max_results(int): maximum number of results cached per prefix.
+            min_length(int): shortest prefix that suggestions are made for.
+            max_length(int): longest prefix cached.
+            debounce(float): minimum number of seconds between upstream requests per client.
+            max_clients(int): maximum number of clients tracked for debouncing.
+
+        """
+
+        self.max_prefixes = max_prefixes
+        self.max_results = max_results
+        self.min_length = min_length
+        self.max_length = max_length
+        self.debounce = debounce
+        self.max_clients = max_clients
+        self._root = _Node()
+        self._cached = OrderedDict()
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._cached)
+
+
+    def normalise(self, query: str) -> str:
+        """Normalises a query so that equivalent queries share a prefix.
+
+        Args:
+            query(str): the query as typed, eg " Money  For".
+
+        Returns:
+            The lower case query with whitespace collapsed, eg "money for", truncated to
+            max_length characters.
+
+        """
+
+        if not query:
+            return ""
+        # truncate before splitting too, so a huge query isn't copied in full
+        query = query[:self.max_length * 4]
+        return " ".join(query.lower().split())[:self.max_length]
+
+
+    def get(self, prefix: str) -> list:
+        """Gets the cached results for a prefix.
+
+        Args:
+            prefix(str): a normalised prefix.
+
+        Returns:
+            results(list): the cached results, or None if the prefix is not cached.
+
+        """
+
+        with self._lock:
+            node = self._cached.get(prefix)
+            if node is None:
+                return None
+            self._cached.move_to_end(prefix)
+            return node.results
+
+
+    def is_cached(self, query: str) -> bool:
+        """Checks whether suggestions for a query can be served without an upstream request.
+
+        Args:
+            query(str): the query as typed.
+
+        Returns:
+            True if the query is too short for suggestions or its prefix is cached.
+
+        """
+
+        prefix = self.normalise(query)
+        return len(prefix) < self.min_length or prefix in self._cached
+
+
+    def nearest(self, prefix: str) -> list:
+        """Gets suggestions for a prefix from the longest cached prefix of it.
+
+        Args:
+            prefix(str): a normalised prefix.
+
+        Returns:
+            results(list): cached results whose track name contains the prefix. Empty if no
+            prefix of it is cached.
+
+        """
+
+        with self._lock:
+            node = self._root
+            results = None
+            for character in prefix:
+                node = node.children.get(character)
+                if node is None:
+                    break
+                if node.results is not None:
+                    results = node.results
+        if not results:
+            return []
+        return [track for track in results if prefix in (track.track_name or "").lower()]
+
+
+    def put(self, prefix: str, results: list) -> None:
+        """Caches the results for a prefix, evicting the least recently used prefix if full.
+
+        Empty results are not cached, as they are also what a failed upstream request returns,
+        and prefixes longer than max_length are not cached.
+
+        Args:
+            prefix(str): a normalised prefix.
+            results(list): results for the prefix, eg Track records.
+
+        """
+
+        if not results or len(prefix) > self.max_length:
+            return
+        with self._lock:
+            node = self._root
+            for character in prefix:
+                node = node.children.setdefault(character, _Node())
+            node.results = list(results[:self.max_results])
+            self._cached[prefix] = node
+            self._cached.move_to_end(prefix)
+            while len(self._cached) > self.max_prefixes:
+                self._evict(next(iter(self._cached)))
+
+
+    def _evict(self, prefix: str) -> None:
+        """Removes the results for a prefix and prunes trie nodes that are no longer needed."""
+
+        del self._cached[prefix]
+        path = [self._root]
+        for character in prefix:
+            path.append(path[-1].children[character])
+        path[-1].results = None
+        for depth in range(len(prefix), 0, -1):
+            node = path[depth]
+            if node.children or node.results is not None:
+                break
+            del path[depth - 1].children[prefix[depth - 1]]
+
+
+    def _allow_upstream(self, client: str, now: float) -> bool:
+        """Checks whether a client may make an upstream request now, and records it if so."""
+
+        with self._lock:
+            last = self._clients.get(client)
+            if last is not None and now - last < self.debounce:
+                return False
+            self._clients[client] = now
+            self._clients.move_to_end(client)
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return True
+
+
+    def suggest(self, query: str, client: str, fetch: Callable[[str], list]) -> list:
+        """Gets suggestions for a query, only fetching results for prefixes not seen before.
+
+        Args:
+            query(str): the query as typed.
+            client(str): identifies the client for debouncing, eg its ip address.
+            fetch(Callable): called with the normalised prefix to get results from upstream.
+
+        Returns:
+            results(list): up to max_results suggestions.
+
+        """
+
+        prefix = self.normalise(query)
+        if len(prefix) < self.min_length:
+            return []
+        results = self.get(prefix)
+        if results is not None:
+            return results
+        if not self._allow_upstream(client, time.monotonic()):
+            return self.nearest(prefix)
+        results = fetch(prefix)
+        self.put(prefix, results)
+        return results[:self.max_results]
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Thumbnails
+
+This module implements a local on-disk cache of album cover images from the Spotify CDN. It is
+used by the image proxy route so that repeated pages are served locally rather than refetched.
+The cache can be bounded in size, in which case the least recently used images are removed.
+
+"""
+
+import os
+import tempfile
+import threading
+
+import requests
+
+from .track import CDN_URL, IMAGE_ID, image_id
+
+
+# pruning removes images until the cache is this share of its maximum size, so it runs rarely
+PRUNE_TARGET = 0.9
+
+# the estimated size of a cache directory is rescanned after this many writes, to pick up
+# images written by other workers
+RESCAN_WRITES = 100
+
+# estimated (size, writes since the last scan) of each cache directory - see _make_room()
+_estimates = {}
+_estimates_lock = threading.Lock()
+
+
+def mimetype(path: str) -> str:
+    """Gets the mimetype of a cached image from its first bytes.
+
+    Args:
+        path(str): path of the cached image.
+
+    Returns:
+        "image/png" or "image/jpeg" (the format Spotify uses for album covers).
+
+    """
+
+    with open(path, "rb") as image:
+        if image.read(8) == b"\x89PNG\r\n\x1a\n":
+            return "image/png"
+    return "image/jpeg"
+
+
+def is_cached(directory: str, lookup_id: str) -> bool:
+    """Checks whether an image is in the local cache.
+
+    Args:
+        directory(str): directory the images are cached in.
+        lookup_id(str): image id - see image_id().
+
+    Returns:
+        True if the image is cached.
+
+    """
+
+    return bool(IMAGE_ID.match(lookup_id)) and os.path.exists(
+        os.path.join(directory, lookup_id.lower()))
+
+
+def prune(directory: str, max_bytes: int) -> int:
+    """Removes the least recently used images until the cache is no larger than max_bytes.
+
+    Args:
+        directory(str): directory the images are cached in.
+        max_bytes(int): maximum total size of the cached images.
+
+    Returns:
+        The number of images removed.
+
+    """
+
+    removed, _ = _prune(directory, max_bytes)
+    return removed
+
+
+def _prune(directory: str, max_bytes: int) -> tuple:
+    """Removes the least recently used images, returning (images removed, bytes remaining)."""
+
+    images = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and IMAGE_ID.match(entry.name):
+            stat = entry.stat()
+            images.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in images)
+    removed = 0
+    for _, size, path in sorted(images):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # already removed by another worker
+            pass
+        total -= size
+        removed += 1
+    return removed, total
+
+
+def _make_room(directory: str, size: int, max_bytes: int) -> None:
+    """Prunes the cache if an image of size bytes would take it over max_bytes.
+
+    The cache size is tracked as a running estimate, so the directory is only scanned when the
+    estimate goes over max_bytes or every RESCAN_WRITES writes, not on every cache miss.
+
+    """
+
+    with _estimates_lock:
+        total, writes = _estimates.get(directory, (None, 0))
+        if total is not None and writes < RESCAN_WRITES and total + size <= max_bytes:
+            _estimates[directory] = (total + size, writes + 1)
+            return
+    _, total = _prune(directory, max(int(max_bytes * PRUNE_TARGET) - size, 0))
+    with _estimates_lock:
+        _estimates[directory] = (total + size, 0)
+
+
+def fetch(directory: str, lookup_id: str, max_bytes: int = None) -> str:
+    """Gets the path of a locally cached image, fetching it from the Spotify CDN if necessary.
+
+    Args:
+        directory(str): directory the images are cached in. Created if it doesn't exist.
+        lookup_id(str): image id - see image_id().
+        max_bytes(int): maximum total size of the cached images - see prune(). Unbounded if None.
+
+    Returns:
+        path(str): path of the cached image. If the image id is invalid or the image can't be
+        fetched, returns None.
+
+    """
+
+    if not IMAGE_ID.match(lookup_id):
+        return None
+
+    path = os.path.join(directory, lookup_id.lower())
+    if is_cached(directory, lookup_id):
+        try:
+            # the modification time records when the image was last used - see prune()
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+    try:
+        result = requests.get(CDN_URL + lookup_id, timeout=10)
+    except requests.RequestException:
+        return None
+    if result.status_code not in range(200, 299):
+        return None
+
+    # write to a temporary file first so concurrent requests never see a partial image
+    os.makedirs(directory, exist_ok=True)
+    if max_bytes is not None:
+        _make_room(directory, len(result.content), max_bytes)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".")
+    with os.fdopen(descriptor, "wb") as image:
+        image.write(result.content)
+    os.replace(temp_path, path)
+    return path
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Track
+
+This module implements the Track class, a compact immutable record of the track data formatted
+by SpotifyAPI. Track records use __slots__ rather than a per-instance dict, intern artist names,
+store the musical key as a small integer code rather than a formatted string, and pack album
+cover images into a single bytes object, so that large numbers of them can be held in memory by a
+cache or index.
+
+"""
+
+import re
+import sys
+
+
+KEYS = ("C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab", "A", "Bb", "B")
+
+# every formatted key string, indexed by key code - see encode_key()
+KEY_NAMES = tuple(name for key in KEYS
+                  for name in (key, f"{key} Minor", f"{key} Major")) + ("No Key Available",)
+
+NO_KEY = len(KEY_NAMES) - 1
+
+# the fields of a Track, in constructor order
+FIELDS = ("track_id", "track_name", "artist", "track_url", "images", "key_code", "tempo")
+
+# Spotify CDN image urls - images are stored by id, see _pack_images()
+CDN_URL = "https://i.scdn.co/image/"
+
+IMAGE_ID = re.compile(r"^[0-9a-fA-F]{16,64}$")
+
+
+def image_id(url: str) -> str:
+    """Gets the image id from a Spotify CDN image url.
+
+    Args:
+        url(str): an image url, eg "https://i.scdn.co/image/ab67616d0000b273XXXX".
+
+    Returns:
+        The image id, or None if the url is not a Spotify CDN image url.
+
+    """
+
+    if not url or not url.startswith(CDN_URL):
+        return None
+    lookup_id = url[len(CDN_URL):]
+    if not IMAGE_ID.match(lookup_id):
+        return None
+    return lookup_id
+
+
+def format_images(images: list) -> tuple:
+    """Converts spotify image data to the compact form stored in Track records.
+
+    Args:
+        images(list): a list of image dicts as returned by spotify, largest first, eg
+          [{'url': _, 'width': 640, 'height': 640}, ...].
+
+    Returns:
+        A tuple of (url, width) tuples in the same order. width is None if not known. If there
+        are no images, returns None.
+
+    """
+
+    if not images:
+        return None
+    return tuple((image['url'], image.get('width')) for image in images)
+
+
+def _pack_images(images):
+    """Packs (url, width) tuples into the form stored in Track records.
+
+    Each Spotify CDN image is stored as a 2 byte width (0 if not known), a 1 byte length and the
+    raw bytes of its image id, so the three sizes Spotify returns for an album cover take one
+    ~100 byte object rather than three url strings, widths and tuples. Images are kept as given
+    if any url can't be packed (eg it isn't a Spotify CDN url), and already packed images are
+    returned unchanged.
+
+    """
+
+    if not images or isinstance(images, bytes):
+        return images
+    packed = bytearray()
+    for url, width in images:
+        lookup_id = image_id(url)
+        if (lookup_id is None or len(lookup_id) % 2 or lookup_id != lookup_id.lower()
+                or not 0 <= (width or 0) <= 0xFFFF):
+            return tuple(images)
+        raw_id = bytes.fromhex(lookup_id)
+        packed += (width or 0).to_bytes(2, "big") + bytes((len(raw_id),)) + raw_id
+    return bytes(packed)
+
+
+def _unpack_images(images) -> tuple:
+    """Unpacks images stored by _pack_images() back into (url, width) tuples."""
+
+    if not isinstance(images, bytes):
+        return images
+    unpacked = []
+    position = 0
+    while position < len(images):
+        width = int.from_bytes(images[position:position + 2], "big") or None
+        start = position + 3
+        position = start + images[position + 2]
+        unpacked.append((CDN_URL + images[start:position].hex(), width))
+    return tuple(unpacked)
+
+
+def encode_key(key: int, mode: int = None) -> int:
+    """Converts key and mode value to a key code (an index into KEY_NAMES).
+
+    Args:
+        key(int): a value that corresponds to one of 12 musical keys.
+        mode(int): a value that indicates if major (1) or minor (0) key.
+
+    Returns:
+        An int between 0 and NO_KEY. If no valid key present, returns NO_KEY.
+
+    """
+
+    if key < 0 or key > 11:
+        return NO_KEY
+    if mode == 1:
+        return key * 3 + 2
+    if mode == 0:
+        return key * 3 + 1
+    return key * 3
+
+
+class Track():
+    """
+    An immutable record of formatted track data.
+
+    Fields that are not known (eg key and tempo for search results) are None. Attributes can be
+    accessed in the same way as the keys of the dicts previously returned by SpotifyAPI, so
+    templates can use track.track_name, track.key etc. directly.
+
+    Typical usage example::
+
+        track = Track("XXXXyyyyYYYYxxxxZZZZab", track_name="Money", artist="Pink Floyd",
+                      images=(("https://i.scdn.co/image/XXXX", 640),),
+                      key_code=encode_key(11, 0), tempo=120)
+        print(track.key)
+        'B Minor'
+        print(track.to_dict())
+        {'track_id': 'XXXXyyyyYYYYxxxxZZZZab', 'track_name': 'Money', 'artist': 'Pink Floyd',
+        'image_url': 'https://i.scdn.co/image/XXXX',
+        'images': [{'url': 'https://i.scdn.co/image/XXXX', 'width': 640}],
+        'key': 'B Minor', 'tempo': 120}
+
+    Attributes:
+        track_id: a string of 22 alphanumeric characters related to the track.
+        track_name: name of the track.
+        artist: name of the first artist credited on the track (interned).
+        track_url: url of the track on spotify.
+        images: album cover images as a tuple of (url, width) tuples, largest first - see
+          format_images(). Stored packed, and unpacked each time the attribute is read.
+        key_code: musical key and mode encoded as an int - see encode_key().
+        tempo: tempo of the track in bpm.
+
+    """
+
+    __slots__ = ("track_id", "track_name", "artist", "track_url", "_images", "key_code", "tempo")
+
+
+    def __init__(self, track_id: str, track_name: str = None, artist: str = None,
+                 track_url: str = None, images: tuple = None, key_code: int = None,
+                 tempo: int = None) -> None:
+        """Inits Track record.
+
+        Args:
+            track_id(str): a string of 22 alphanumeric characters related to the track.
+            track_name(str): name of the track.
+            artist(str): name of the artist.
+            track_url(str): url of the track on spotify.
+            images(tuple): album cover images as (url, width) tuples - see format_images().
+            key_code(int): musical key and mode encoded by encode_key().
+            tempo(int): tempo of the track in bpm.
+
+        """
+
+        init = object.__setattr__
+        init(self, "track_id", track_id)
+        init(self, "track_name", track_name)
+        init(self, "artist", sys.intern(artist) if artist is not None else None)
+        init(self, "track_url", track_url)
+        init(self, "_images", _pack_images(images))
+        init(self, "key_code", key_code)
+        init(self, "tempo", tempo)
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Track records are immutable")
+
+
+    def __delattr__(self, name):
+        raise AttributeError("Track records are immutable")
+
+
+    def __reduce__(self):
+        # pickle by constructor arguments, as __setattr__ is disabled - images stay packed
+        return (Track, self._values())
+
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values() == other._values()
+
+
+    def __hash__(self) -> int:
+        return hash(self._values())
+
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in FIELDS)
+        return f"Track({fields})"
+
+
+    @property
+    def images(self) -> tuple:
+        """Album cover images as (url, width) tuples, largest first, or None if unknown."""
+
+        return _unpack_images(self._images)
+
+
+    @property
+    def key(self) -> str:
+        """Musical key as a formatted string (eg "B Minor"), or None if unknown."""
+
+        if self.key_code is None:
+            return None
+        return KEY_NAMES[self.key_code]
+
+
+    @property
+    def image_url(self) -> str:
+        """Url of the largest album cover image, or None if unknown."""
+
+        images = self.images
+        if not images:
+            return None
+        return images[0][0]
+
+
+    def replace(self, **changes) -> "Track":
+        """Returns a new Track with the given fields replaced.
+
+        Args:
+            changes: field names and new values, eg track_name="Money".
+
+        Returns:
+            A new Track record.
+
+        """
+
+        values = dict(zip(FIELDS, self._values()))
+        values.update(changes)
+        return Track(**values)
+
+
+    def to_dict(self) -> dict:
+        """Formats the record as a dict, eg for JSON output.
+
+        Returns:
+            A dict of the known fields, with the key code formatted as a string under 'key'.
+            Unknown (None) fields are omitted.
+
+        """
+
+        data = {"track_id": self.track_id,
+                "track_name": self.track_name,
+                "artist": self.artist,
+                "track_url": self.track_url,
+                "image_url": self.image_url,
+                "images": [{"url": url, "width": width}
+                           for url, width in self.images] if self._images else None,
+                "key": self.key,
+                "tempo": self.tempo}
+        return {name: value for name, value in data.items() if value is not None}
@@ -2,20 +2,109 @@
 All web app views (aka routes) for BPM flask application found in here.
 """
 
+import hmac
 import os
+from typing import Callable
 
-from flask import (Blueprint, render_template, url_for, redirect, request, flash)
+import flask
+from flask import (Blueprint, url_for, redirect, request, flash, abort,
+                   current_app, send_file, jsonify, Response, stream_with_context)
+from . import cassette, catalogue, thumbnails
+from .admission import limit_upstream
+from .profiling import traced
 from .spotify import SpotifyAPI
 
 
 # Configure Blueprint
 main = Blueprint("main", __name__)
 
+# Template rendering is recorded in the timeline of profiled requests
+render_template = traced("render_template")(flask.render_template)
+
 # Configure Spotify API
 CLIENT_ID = os.environ.get('CLIENT_ID')
 CLIENT_SECRET = os.environ.get('CLIENT_SECRET')
 if CLIENT_ID and CLIENT_SECRET: # this is for Sphinx auto-doc-extension
-    spotify = SpotifyAPI(CLIENT_ID, CLIENT_SECRET)
+    spotify = SpotifyAPI(CLIENT_ID, CLIENT_SECRET, cassette=cassette.from_env(os.environ))
+
+
+@main.app_template_filter("image_src")
+def image_src(url: str) -> str:
+    """Template filter for album cover image urls
+
+    Args:
+        url(str): spotify image url.
+
+    Returns:
+        The url of the image proxy route for the image if THUMBNAIL_CACHE_DIR is configured,
+        otherwise the unaltered url.
+
+    """
+
+    if not url:
+        return ""
+    lookup_id = thumbnails.image_id(url)
+    if lookup_id and current_app.config.get("THUMBNAIL_CACHE_DIR"):
+        return url_for('main.main_image', image_id=lookup_id)
+    return url
+
+
+@main.app_template_filter("srcset")
+def srcset(images: tuple) -> str:
+    """Template filter for the srcset attribute of album cover images
+
+    Args:
+        images(tuple): (url, width) tuples from Track.images.
+
+    Returns:
+        A srcset string such as "<url> 640w, <url> 300w" so the browser can pick the smallest
+        suitable image. Images with no known width are left out.
+
+    """
+
+    if not images:
+        return ""
+    return ", ".join(f"{image_src(url)} {width}w" for url, width in images if width)
+
+
+def _number_arg(name: str, convert: Callable, default=None):
+    """Gets a numeric query string parameter.
+
+    Raises:
+        ValueError: Invalid <name> (if the parameter isn't a number)
+
+    """
+
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return convert(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+
+def _search_query() -> dict:
+    """Gets the search query from the search form."""
+
+    search_query = {}
+    if request.form.get('track'):
+        search_query = {'track': request.form.get('track')}
+    return search_query
+
+
+def _advanced_search_query() -> dict:
+    """Gets the search query from the advanced search form."""
+
+    search_query = {}
+    if request.form.get('track'):
+        search_query['track'] = request.form.get('track')
+    if request.form.get('artist'):
+        search_query['artist'] = request.form.get('artist')
+    if request.form.get('album'):
+        search_query['album'] = request.form.get('album')
+    return search_query
+
 
 @main.route('/')
 def main_index():
@@ -30,6 +119,7 @@ def main_index():
 
 
 @main.route('/search', methods=["GET", "POST"])
+@limit_upstream(lambda: request.method == "GET" or spotify.is_search_cached(_search_query()))
 def main_search():
     """Search route
 
@@ -40,18 +130,47 @@ def main_search():
     """
 
     if request.method == "POST":
-
-        search_query = {}
-        if request.form.get('track'):
-            search_query = {'track': request.form.get('track')}
-
+        search_query = _search_query()
         tracks = spotify.get_tracks(search_query)
+        if search_query:
+            # recent searches are also used as suggestions
+            suggestions = current_app.extensions["suggestions"]
+            suggestions.put(suggestions.normalise(search_query['track']), tracks)
         return render_template("search.html", tracks=tracks)
 
     return redirect(url_for('main.main_index'))
 
 
+@main.route('/suggest')
+@limit_upstream(lambda: current_app.extensions["suggestions"].is_cached(request.args.get('q')))
+def main_suggest():
+    """Search-as-you-type suggestion route
+
+    Suggestions are served from the in-memory prefix cache - the Spotify API is only searched
+    for prefixes that have not been seen before, at most once per SUGGEST_DEBOUNCE seconds per
+    client.
+
+    Args:
+        q(str): query string parameter - the track name typed so far.
+
+    Returns:
+        GET - JSON object containing a list of suggested tracks.
+
+    """
+
+    query = request.args.get('q', '')
+    suggestions = current_app.extensions["suggestions"]
+    tracks = suggestions.suggest(query, client=request.remote_addr,
+                                 fetch=lambda prefix: spotify.get_tracks({'track': prefix}))
+    return jsonify(query=query,
+                   suggestions=[{'track_id': track.track_id,
+                                 'track_name': track.track_name,
+                                 'artist': track.artist} for track in tracks])
+
+
 @main.route('/advanced', methods=["GET", "POST"])
+@limit_upstream(lambda: (request.method == "GET"
+                         or spotify.is_search_cached(_advanced_search_query())))
 def main_advanced_search():
     """Advanced Search route
 
@@ -62,14 +181,7 @@ def main_advanced_search():
     """
 
     if request.method == "POST":
-        search_query = {}
-        if request.form.get('track'):
-            search_query['track'] = request.form.get('track')
-        if request.form.get('artist'):
-            search_query['artist'] = request.form.get('artist')
-        if request.form.get('album'):
-            search_query['album'] = request.form.get('album')
-
+        search_query = _advanced_search_query()
         tracks = spotify.get_tracks(search_query)
         return render_template("search.html", tracks=tracks)
 
@@ -78,6 +190,7 @@ def main_advanced_search():
 
 @main.route('/track')
 @main.route('/track/<id>')
+@limit_upstream(lambda: spotify.is_track_cached(request.view_args.get('id')))
 def main_track_details(id: str = None):
     """Track Details route
 
@@ -94,4 +207,79 @@ def main_track_details(id: str = None):
     except:
         flash('Incorrect Track ID entered! Try again.')
         return redirect(url_for('main.main_index'))
-    return render_template("track.html", track=track)
\ No newline at end of file
+    return render_template("track.html", track=track)
+
+
+@main.route('/image/<image_id>')
+@limit_upstream(lambda: (not current_app.config.get("THUMBNAIL_CACHE_DIR")
+                         or thumbnails.is_cached(current_app.config["THUMBNAIL_CACHE_DIR"],
+                                                 request.view_args['image_id'])))
+def main_image(image_id: str):
+    """Image proxy route - serves album cover images from the local thumbnail cache
+
+    Only enabled if THUMBNAIL_CACHE_DIR is configured. Images are fetched from the Spotify CDN
+    the first time they are requested and served with long-lived cache headers.
+
+    Args:
+        image_id(str): Spotify CDN image id
+
+    Returns:
+        GET - the image, 404 if the proxy is disabled or the image doesn't exist.
+
+    """
+
+    directory = current_app.config.get("THUMBNAIL_CACHE_DIR")
+    if not directory:
+        abort(404)
+    path = thumbnails.fetch(directory, image_id,
+                            max_bytes=current_app.config.get("THUMBNAIL_CACHE_MAX_BYTES"))
+    if path is None:
+        abort(404)
+    max_age = current_app.config["THUMBNAIL_MAX_AGE"]
+    response = send_file(path, mimetype=thumbnails.mimetype(path), cache_timeout=max_age,
+                         conditional=True)
+    response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+    return response
+
+
+@main.route('/export')
+def main_export():
+    """Catalogue export route - streams every track the service has resolved
+
+    Only enabled if CATALOGUE_PATH is configured. If CATALOGUE_EXPORT_TOKEN is configured, it must
+    be sent as a bearer token in the Authorization header.
+
+    Args:
+        format(str): query string parameter - "ndjson" (default) or "csv".
+        min_tempo(int): query string parameter - minimum tempo in bpm.
+        max_tempo(int): query string parameter - maximum tempo in bpm.
+        key(str): query string parameter - musical key, eg "E Major".
+        since(float): query string parameter - only tracks last seen since this unix time.
+        cursor(int): query string parameter - cursor of the last record of an earlier export.
+
+    Returns:
+        GET - a streamed NDJSON or CSV response, 400 if a parameter is invalid, 404 if the
+        catalogue is not configured.
+
+    """
+
+    tracks = current_app.extensions.get("catalogue")
+    if tracks is None:
+        abort(404)
+    token = current_app.config.get("CATALOGUE_EXPORT_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                                         f"Bearer {token}".encode()):
+        abort(401)
+
+    export_format = request.args.get('format', 'ndjson')
+    try:
+        records = tracks.export(min_tempo=_number_arg('min_tempo', int),
+                                max_tempo=_number_arg('max_tempo', int),
+                                key=request.args.get('key'),
+                                since=_number_arg('since', float),
+                                cursor=_number_arg('cursor', int, 0))
+        lines = catalogue.lines(records, export_format)
+    except Exception as error:
+        abort(400, str(error))
+    mimetype = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(lines), mimetype=mimetype)
@@ -1,5 +1,6 @@
 """All pytest fixtures and configuration"""
 
+import json
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
@@ -8,6 +9,7 @@ import pytest
 from unittest.mock import Mock, patch
 
 from bpm import spotify
+from bpm.track import Track, encode_key
 
 
 @pytest.fixture
@@ -54,6 +56,7 @@ def invalid_request():
     mock = Mock()
     mock.status_code = 400
     mock.json.return_value = {'error': 'error'}
+    mock.content = json.dumps(mock.json.return_value).encode()
     return mock
 
 
@@ -70,17 +73,18 @@ def valid_request():
          'album': {'images': [{'url': 'mock_image_url'}]},
         }] # end of items list
         }} # end of ['tracks']['items'] dict
+    mock.content = json.dumps(mock.json.return_value).encode()
     return mock
 
 
 @pytest.fixture
 def valid_get_tracks_data() -> list:
-    return [{'track_id': 'mock_id',
-             'track_name': 'mock_name',
-             'artist': 'mock_artist',
-             'track_url': 'mock_track_url',
-             'image_url': 'mock_image_url'
-             }]
+    return [Track('mock_id',
+                  track_name='mock_name',
+                  artist='mock_artist',
+                  track_url='mock_track_url',
+                  images=(('mock_image_url', None),)
+                  )]
 
 
 @pytest.fixture
@@ -96,20 +100,21 @@ def valid_track_data_request(valid_request) -> Mock:
     mock = Mock()
     mock.status_code = 200
     mock.json.return_value = {**get_resource, **get_musical_data}
+    mock.content = json.dumps(mock.json.return_value).encode()
     return mock
 
 @pytest.fixture
-def valid_get_musical_data() -> dict:
-    return {'track_id': 'mock_track_id',
-            'key': 'E Major',
-            'tempo': 120}
+def valid_get_musical_data() -> Track:
+    return Track('mock_track_id',
+                 key_code=encode_key(4, 1),
+                 tempo=120)
 
 @pytest.fixture
-def valid_get_track_data() -> dict:
-    return {'track_id': 'mock_track_id',
-            'key': 'E Major',
-            'tempo': 120, 
-            'track_name': 'mock_name', 
-            'artist': 'mock_artist', 
-            'track_url': 'mock_track_url', 
-            'image_url': 'mock_image_url'}
\ No newline at end of file
+def valid_get_track_data() -> Track:
+    return Track('mock_track_id',
+                 key_code=encode_key(4, 1),
+                 tempo=120,
+                 track_name='mock_name',
+                 artist='mock_artist',
+                 track_url='mock_track_url',
+                 images=(('mock_image_url', None),))
\ No newline at end of file
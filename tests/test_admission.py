@@ -0,0 +1,145 @@
+"""Tests for admission.py module"""
+import threading
+import time
+import pytest
+import requests
+from flask import Flask
+from werkzeug.serving import make_server
+from bpm import admission
+
+
+def wait_until(condition, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("timed out waiting for the admission controller")
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def admission_app():
+    app = Flask(__name__)
+    app.config.from_mapping(ADMISSION_ENABLED=True,
+                            ADMISSION_LIMITS={"mock_route": 1},
+                            ADMISSION_DEFAULT_LIMIT=8,
+                            ADMISSION_QUEUE_SIZE=0,
+                            ADMISSION_TIMEOUT=0.01,
+                            ADMISSION_RETRY_AFTER=2)
+    admission.init_app(app)
+    app.cached = False
+
+    @app.route("/", endpoint="mock_route")
+    @admission.limit_upstream(lambda: app.cached)
+    def mock_route():
+        return "mock_response"
+
+    return app
+
+
+class TestAdmissionController:
+    '''Test the AdmissionController class'''
+
+    def test_limit(self):
+        controller = admission.AdmissionController(limit=2, queue_size=0, timeout=0)
+        assert controller.acquire()
+        assert controller.acquire()
+        assert not controller.acquire()
+        controller.release()
+        assert controller.acquire()
+
+    def test_queue_timeout(self):
+        controller = admission.AdmissionController(limit=1, queue_size=1, timeout=0.01)
+        assert controller.acquire()
+        assert not controller.acquire()
+        assert controller.waiting == 0
+
+    def test_queued_request_admitted_on_release(self):
+        controller = admission.AdmissionController(limit=1, queue_size=1, timeout=5)
+        controller.acquire()
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(controller.acquire()))
+        waiter.start()
+        wait_until(lambda: controller.waiting == 1)
+        # the queue is full, so a further request is rejected straight away
+        assert not controller.acquire()
+        controller.release()
+        waiter.join(5)
+        assert results == [True]
+        assert controller.active == 1
+
+
+class TestLimitUpstream:
+    '''Test the limit_upstream decorator'''
+
+    def test_per_route_limit(self, admission_app):
+        assert admission_app.extensions["admission"].controller("mock_route").limit == 1
+        assert admission_app.extensions["admission"].controller("other_route").limit == 8
+
+    def test_admitted(self, admission_app):
+        response = admission_app.test_client().get("/")
+        assert response.status_code == 200
+        assert admission_app.extensions["admission"].controller("mock_route").active == 0
+
+    def test_rejected(self, admission_app):
+        admission_app.extensions["admission"].controller("mock_route").acquire()
+        response = admission_app.test_client().get("/")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "2"
+
+    def test_cached_request_skips_limit(self, admission_app):
+        admission_app.extensions["admission"].controller("mock_route").acquire()
+        admission_app.cached = True
+        assert admission_app.test_client().get("/").status_code == 200
+
+    def test_disabled(self):
+        app = Flask(__name__)
+        admission.init_app(app)
+        assert "admission" not in app.extensions
+
+
+class TestThreadedServer:
+    '''Test admission control of concurrent requests to a threaded server'''
+
+    def test_concurrent_requests(self):
+        app = Flask(__name__)
+        app.config.from_mapping(ADMISSION_ENABLED=True,
+                                ADMISSION_LIMITS={},
+                                ADMISSION_DEFAULT_LIMIT=2,
+                                ADMISSION_QUEUE_SIZE=1,
+                                ADMISSION_TIMEOUT=5,
+                                ADMISSION_RETRY_AFTER=1)
+        admission.init_app(app)
+        upstream = threading.Event()
+
+        @app.route("/", endpoint="mock_route")
+        @admission.limit_upstream()
+        def mock_route():
+            upstream.wait(5)
+            return "mock_response"
+
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/"
+        controller = app.extensions["admission"].controller("mock_route")
+        statuses = []
+
+        def get():
+            statuses.append(requests.get(url, timeout=10).status_code)
+
+        try:
+            clients = [threading.Thread(target=get) for _ in range(3)]
+            for client in clients:
+                client.start()
+            wait_until(lambda: controller.active == 2 and controller.waiting == 1)
+            # two requests in flight and one queued, so a fourth is shed straight away
+            rejected = requests.get(url, timeout=10)
+            assert rejected.status_code == 503
+            assert rejected.headers["Retry-After"] == "1"
+            upstream.set()
+            for client in clients:
+                client.join(10)
+            assert statuses == [200, 200, 200]
+            assert controller.active == 0
+        finally:
+            upstream.set()
+            server.shutdown()
@@ -0,0 +1,78 @@
+"""Tests for assets.py module"""
+import gzip
+import pytest
+from flask import Flask, url_for
+from bpm import assets
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    (tmp_path / "style.css").write_text("body { color: black; }\n" * 20)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\nmock_png")
+    return tmp_path
+
+
+@pytest.fixture
+def built_app(static_folder):
+    manifest = assets.build(str(static_folder))
+    app = Flask(__name__, static_folder=str(static_folder), static_url_path="/static")
+    assets.init_app(app)
+    return app, manifest
+
+
+class TestBuild:
+    '''Test the asset build step'''
+
+    def test_manifest(self, static_folder):
+        manifest = assets.build(str(static_folder))
+        assert set(manifest) == {"style.css", "logo.png"}
+        assert manifest["style.css"].startswith("dist/style.")
+        assert (static_folder / manifest["logo.png"]).read_bytes() == b"\x89PNG\r\n\x1a\nmock_png"
+
+    def test_precompressed(self, static_folder):
+        manifest = assets.build(str(static_folder))
+        compressed = (static_folder / (manifest["style.css"] + ".gz")).read_bytes()
+        assert gzip.decompress(compressed) == (static_folder / "style.css").read_bytes()
+        assert not (static_folder / (manifest["logo.png"] + ".gz")).exists()
+
+    def test_rebuild_is_stable(self, static_folder):
+        assert assets.build(str(static_folder)) == assets.build(str(static_folder))
+
+
+class TestInitApp:
+    '''Test serving of fingerprinted static files'''
+
+    def test_url_for(self, built_app):
+        app, manifest = built_app
+        with app.test_request_context():
+            assert url_for("static", filename="style.css") == "/static/" + manifest["style.css"]
+
+    def test_gzip_response(self, built_app):
+        app, manifest = built_app
+        response = app.test_client().get("/static/" + manifest["style.css"],
+                                         headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.mimetype == "text/css"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert "Accept-Encoding" in response.headers["Vary"]
+        response.close()
+
+    def test_uncompressed_response(self, built_app):
+        app, manifest = built_app
+        response = app.test_client().get("/static/" + manifest["style.css"])
+        assert "Content-Encoding" not in response.headers
+        assert response.data.startswith(b"body")
+        response.close()
+
+    def test_original_file_without_fingerprint(self, built_app):
+        app, _ = built_app
+        response = app.test_client().get("/static/style.css")
+        assert response.status_code == 200
+        assert "immutable" not in response.headers.get("Cache-Control", "")
+        response.close()
+
+    def test_without_build(self, static_folder):
+        app = Flask(__name__, static_folder=str(static_folder), static_url_path="/static")
+        assets.init_app(app)
+        with app.test_request_context():
+            assert url_for("static", filename="style.css") == "/static/style.css"
@@ -0,0 +1,38 @@
+"""Tests for cache.py module"""
+from unittest.mock import patch
+from bpm.cache import TTLCache
+
+
+class TestTTLCache:
+    '''Test the TTLCache class'''
+
+    def test_get_and_set(self):
+        cache = TTLCache()
+        cache.set("mock_key", "mock_value")
+        assert cache.get("mock_key") == "mock_value"
+        assert "mock_key" in cache
+
+    def test_missing_key(self):
+        cache = TTLCache()
+        assert cache.get("mock_key") is None
+        assert cache.get("mock_key", "mock_default") == "mock_default"
+        assert "mock_key" not in cache
+
+    def test_expiry(self):
+        cache = TTLCache(ttl=10)
+        with patch('bpm.cache.time.time', return_value=1000):
+            cache.set("mock_key", "mock_value")
+        with patch('bpm.cache.time.time', return_value=1011):
+            assert "mock_key" not in cache
+            assert cache.get("mock_key") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(max_entries=2)
+        cache.set("first", 1)
+        cache.set("second", 2)
+        cache.get("first")
+        cache.set("third", 3)
+        assert "second" not in cache
+        assert cache.get("first") == 1
+        assert len(cache) == 2
@@ -0,0 +1,110 @@
+"""Tests for cassette.py module"""
+import pytest
+from unittest.mock import Mock, patch
+from bpm import spotify
+from bpm.cassette import Cassette, REDACTED_TOKEN, from_env, redact
+
+
+@pytest.fixture
+def cassette_path(tmp_path) -> str:
+    return str(tmp_path / "mock.cassette")
+
+
+@pytest.fixture
+def valid_token_request() -> Mock:
+    mock = Mock()
+    mock.status_code = 200
+    mock.content = b'{"access_token": "mock_access_token", "expires_in": 200}'
+    mock.json.return_value = {'access_token': 'mock_access_token', 'expires_in': 200}
+    return mock
+
+
+class TestCassette:
+    '''Test recording and replaying responses'''
+
+    def test_invalid_mode(self, cassette_path):
+        with pytest.raises(Exception):
+            Cassette(cassette_path, mode="invalid")
+
+    def test_key_ignores_data_order(self):
+        assert (Cassette.key("POST", "mock_url", {"a": 1, "b": 2})
+                == Cassette.key("POST", "mock_url", {"b": 2, "a": 1}))
+        assert Cassette.key("GET", "mock_url") != Cassette.key("GET", "other_url")
+
+    def test_record_then_replay(self, cassette_path, valid_request):
+        recorder = Cassette(cassette_path, mode="record")
+        assert recorder.request("GET", "mock_url", lambda: valid_request) is valid_request
+        recorder.close()
+
+        player = Cassette(cassette_path, mode="replay", latency_scale=0)
+        send = Mock()
+        response = player.request("GET", "mock_url", send)
+        send.assert_not_called()
+        assert response.status_code == 200
+        assert response.content == valid_request.content
+        assert response.json() == valid_request.json.return_value
+        assert len(player) == 1
+
+    def test_replay_latency(self, cassette_path, valid_request):
+        cassette = Cassette(cassette_path, mode="replay", latency_scale=2)
+        cassette.save(Cassette.key("GET", "mock_url"), 200, valid_request.content, 0.5)
+        with patch('bpm.cassette.time.sleep') as mock_sleep:
+            cassette.request("GET", "mock_url", Mock())
+            mock_sleep.assert_called_once_with(1.0)
+
+    def test_replay_missing_request(self, cassette_path):
+        with pytest.raises(Exception):
+            Cassette(cassette_path, mode="replay").request("GET", "mock_url", Mock())
+
+    def test_from_env(self, cassette_path):
+        assert from_env({}) is None
+        cassette = from_env({"SPOTIFY_CASSETTE": cassette_path,
+                             "SPOTIFY_CASSETTE_MODE": "record",
+                             "SPOTIFY_CASSETTE_LATENCY_SCALE": "0.5"})
+        assert cassette.mode == "record"
+        assert cassette.latency_scale == 0.5
+
+
+class TestRedact:
+    '''Test removal of access tokens from recorded responses'''
+
+    def test_token_response(self, valid_token_request):
+        content = redact(valid_token_request.content)
+        assert b"mock_access_token" not in content
+        assert spotify.decoding.loads(content) == {'access_token': REDACTED_TOKEN,
+                                                   'expires_in': 200}
+
+    def test_other_responses_unchanged(self):
+        assert redact(b'{"tracks": {"items": []}}') == b'{"tracks": {"items": []}}'
+        assert redact(b'"access_token" not json') == b'"access_token" not json'
+
+    def test_recorded_token_redacted(self, cassette_path, valid_token_request):
+        cassette = Cassette(cassette_path, mode="record")
+        cassette.request("POST", "mock_url", lambda: valid_token_request, data={"a": 1})
+        recorded = cassette.load(Cassette.key("POST", "mock_url", {"a": 1}))
+        assert b"mock_access_token" not in recorded.content
+
+
+class TestSpotifyAPICassette:
+    '''Test recording and replaying SpotifyAPI requests'''
+
+    def test_record_then_replay_get_tracks(self, cassette_path, valid_token_request,
+                                           valid_request, valid_get_tracks_data):
+        query = {"track": "mock_track_name"}
+        with patch('bpm.spotify.requests.post') as mock_post, \
+                patch('bpm.spotify.requests.get') as mock_get:
+            mock_post.return_value = valid_token_request
+            mock_get.return_value = valid_request
+            recorder = spotify.SpotifyAPI("mock_client_id", "mock_client_secret",
+                                          cassette=Cassette(cassette_path, mode="record"))
+            assert recorder.get_tracks(query) == valid_get_tracks_data
+
+        with patch('bpm.spotify.requests.post') as mock_post, \
+                patch('bpm.spotify.requests.get') as mock_get:
+            player = spotify.SpotifyAPI("mock_client_id", "mock_client_secret",
+                                        cassette=Cassette(cassette_path, latency_scale=0))
+            # the token recorded in the cassette is a placeholder, not the live token
+            assert player.access_token == REDACTED_TOKEN
+            assert player.get_tracks(query) == valid_get_tracks_data
+            mock_post.assert_not_called()
+            mock_get.assert_not_called()
@@ -0,0 +1,201 @@
+"""Tests for catalogue.py module"""
+import json
+import sqlite3
+import pytest
+from unittest.mock import patch
+from flask import Flask
+from bpm import catalogue, create_app
+from bpm.catalogue import Catalogue
+from bpm.track import Track, encode_key
+
+
+@pytest.fixture
+def mock_catalogue(tmp_path) -> Catalogue:
+    tracks = Catalogue(str(tmp_path / "mock.db"))
+    for number, (tempo, key) in enumerate([(100, 4), (120, 4), (140, 6)]):
+        tracks.record(Track(f"mock_id_{number}", track_name=f"mock_name_{number}",
+                            artist="mock_artist", key_code=encode_key(key, 1), tempo=tempo))
+    return tracks
+
+
+@pytest.fixture
+def catalogue_app(mock_catalogue) -> Flask:
+    app = Flask(__name__)
+    app.config["CATALOGUE_PATH"] = mock_catalogue.path
+    catalogue.init_app(app, None)
+    return app
+
+
+@pytest.fixture
+def export_client(mock_catalogue):
+    return create_app({"CATALOGUE_PATH": mock_catalogue.path}).test_client()
+
+
+class TestCatalogue:
+    '''Test recording and exporting tracks'''
+
+    def test_export(self, mock_catalogue):
+        records = list(mock_catalogue.export())
+        assert [record["track_id"] for record in records] == ["mock_id_0", "mock_id_1",
+                                                              "mock_id_2"]
+        assert records[0]["key"] == "E Major"
+        assert records[0]["tempo"] == 100
+        assert records[0]["last_seen"].endswith("+00:00")
+
+    def test_export_filters(self, mock_catalogue):
+        records = mock_catalogue.export(min_tempo=110, max_tempo=150, key="E Major")
+        assert [record["track_id"] for record in records] == ["mock_id_1"]
+
+    def test_export_since(self, mock_catalogue):
+        assert list(mock_catalogue.export(since=0))
+        assert not list(mock_catalogue.export(since=4102444800))
+
+    def test_invalid_key(self, mock_catalogue):
+        with pytest.raises(Exception):
+            mock_catalogue.export(key="H Major")
+
+    def test_export_in_batches(self, mock_catalogue):
+        records = list(mock_catalogue.export(batch_size=2))
+        assert len(records) == 3
+
+    def test_incremental_export(self, mock_catalogue):
+        cursor = list(mock_catalogue.export())[-1]["cursor"]
+        assert list(mock_catalogue.export(cursor=cursor)) == []
+        # seeing a track again updates it and includes it in the next incremental export
+        mock_catalogue.record(Track("mock_id_0", track_name="mock_name_0", artist="mock_artist",
+                                    key_code=encode_key(4, 1), tempo=101))
+        records = list(mock_catalogue.export(cursor=cursor))
+        assert [(record["track_id"], record["tempo"]) for record in records] == [("mock_id_0",
+                                                                                  101)]
+        assert len(mock_catalogue) == 3
+
+    def test_enqueue_writes_in_batches(self, mock_catalogue):
+        with patch.object(Catalogue, 'record_many', wraps=mock_catalogue.record_many) as record:
+            # queue tracks before the writer thread starts, so they are all in its first batch
+            mock_catalogue._writer = "mock_writer"
+            mock_catalogue.enqueue(Track("mock_id_3", tempo=100))
+            mock_catalogue.enqueue(Track("mock_id_4", tempo=100))
+            mock_catalogue._writer = None
+            mock_catalogue.enqueue(Track("mock_id_3", tempo=110))
+            mock_catalogue.flush()
+        record.assert_called_once()
+        assert len(mock_catalogue) == 5
+        records = mock_catalogue.export(min_tempo=110, max_tempo=110)
+        assert [record["track_id"] for record in records] == ["mock_id_3"]
+
+    def test_enqueue_drops_when_full(self, tmp_path):
+        tracks = Catalogue(str(tmp_path / "mock.db"), queue_size=1)
+        tracks._writer = "mock_writer"
+        tracks.enqueue(Track("mock_id_0"))
+        tracks.enqueue(Track("mock_id_1"))
+        assert tracks.dropped == 1
+
+    def test_export_ignores_tracks_recorded_during_export(self, mock_catalogue):
+        records = mock_catalogue.export(batch_size=2)
+        track_ids = [next(records)["track_id"]]
+        # a track seen again mid-export gets a new cursor, beyond the end of this export
+        mock_catalogue.record(Track("mock_id_0", tempo=100))
+        mock_catalogue.record(Track("mock_id_3", tempo=100))
+        track_ids += [record["track_id"] for record in records]
+        assert track_ids == ["mock_id_0", "mock_id_1", "mock_id_2"]
+        records = mock_catalogue.export(cursor=3)
+        assert [record["track_id"] for record in records] == ["mock_id_0", "mock_id_3"]
+
+    def test_dropped_tracks_logged(self, tmp_path, caplog):
+        tracks = Catalogue(str(tmp_path / "mock.db"), queue_size=1)
+        tracks._writer = "mock_writer"
+        with patch('bpm.catalogue.DROPPED_LOG_EVERY', 2):
+            for number in range(4):
+                tracks.enqueue(Track(f"mock_id_{number}"))
+        assert tracks.dropped == 3
+        warnings = [record for record in caplog.records if record.levelname == "WARNING"]
+        assert len(warnings) == 2
+
+    def test_ndjson_lines(self, mock_catalogue):
+        lines = list(catalogue.lines(mock_catalogue.export(), "ndjson"))
+        assert len(lines) == 3
+        assert json.loads(lines[0])["track_id"] == "mock_id_0"
+
+    def test_csv_lines(self, mock_catalogue):
+        text = "".join(catalogue.lines(mock_catalogue.export(), "csv"))
+        rows = text.splitlines()
+        assert rows[0] == ",".join(catalogue.FIELDS)
+        assert len(rows) == 4
+
+    def test_invalid_format(self, mock_catalogue):
+        with pytest.raises(Exception):
+            catalogue.lines(mock_catalogue.export(), "xml")
+
+
+class TestSpotifyAPICatalogue:
+    '''Test recording of tracks resolved by the SpotifyAPI Class using Mock'''
+
+    def test_get_track_recorded(self, mock_spotify_api_class, valid_track_data_request,
+                                tmp_path):
+        mock_spotify_api_class.catalogue = Catalogue(str(tmp_path / "mock.db"))
+        with patch('bpm.spotify.requests.get') as mock_requests:
+            mock_requests.return_value = valid_track_data_request
+            mock_spotify_api_class.get_track(lookup_id="mock_track_id")
+        mock_spotify_api_class.catalogue.flush()
+        record, = mock_spotify_api_class.catalogue.export()
+        assert record["track_id"] == "mock_track_id"
+        assert record["key"] == "E Major"
+
+    def test_cache_hit_recorded(self, mock_spotify_api_class, valid_track_data_request,
+                                tmp_path):
+        mock_spotify_api_class.catalogue = Catalogue(str(tmp_path / "mock.db"))
+        with patch('bpm.spotify.requests.get') as mock_requests:
+            mock_requests.return_value = valid_track_data_request
+            mock_spotify_api_class.get_track(lookup_id="mock_track_id")
+            mock_spotify_api_class.catalogue.flush()
+            first_seen = list(mock_spotify_api_class.catalogue.export())[0]["last_seen"]
+            with patch('bpm.catalogue.time.time', return_value=4102444800):
+                mock_spotify_api_class.get_track(lookup_id="mock_track_id")
+            mock_spotify_api_class.catalogue.flush()
+        record, = mock_spotify_api_class.catalogue.export()
+        assert record["last_seen"] > first_seen
+
+    def test_failed_write_not_raised(self, mock_spotify_api_class, valid_track_data_request,
+                                     tmp_path, valid_get_track_data):
+        mock_spotify_api_class.catalogue = Catalogue(str(tmp_path / "mock.db"))
+        with patch('bpm.spotify.requests.get') as mock_requests, \
+                patch.object(Catalogue, 'record_many', side_effect=sqlite3.OperationalError):
+            mock_requests.return_value = valid_track_data_request
+            assert mock_spotify_api_class.get_track(lookup_id="mock_track_id") == \
+                valid_get_track_data
+            mock_spotify_api_class.catalogue.flush()
+        assert len(mock_spotify_api_class.catalogue) == 0
+
+
+class TestExport:
+    '''Test the export command'''
+
+    def test_command(self, catalogue_app):
+        result = catalogue_app.test_cli_runner().invoke(
+            args=["export-tracks", "--format", "csv", "--min-tempo", "110"])
+        assert result.exit_code == 0
+        assert len(result.output.splitlines()) == 3
+
+    def test_command_without_catalogue(self):
+        app = Flask(__name__)
+        catalogue.init_app(app, None)
+        result = app.test_cli_runner().invoke(args=["export-tracks"])
+        assert result.exit_code != 0
+
+
+class TestExportRoute:
+    '''Test the export route'''
+
+    def test_export(self, export_client):
+        response = export_client.get("/export?min_tempo=110&max_tempo=130")
+        assert response.status_code == 200
+        assert [json.loads(line)["track_id"]
+                for line in response.get_data(as_text=True).splitlines()] == ["mock_id_1"]
+
+    @pytest.mark.parametrize("parameter", ["min_tempo", "max_tempo", "since", "cursor"])
+    def test_non_numeric_parameter(self, export_client, parameter):
+        response = export_client.get(f"/export?{parameter}=abc")
+        assert response.status_code == 400
+
+    def test_invalid_key(self, export_client):
+        assert export_client.get("/export?key=H+Major").status_code == 400
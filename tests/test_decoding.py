@@ -0,0 +1,42 @@
+"""Tests for decoding.py module"""
+import json
+import pytest
+from unittest.mock import patch
+from bpm import decoding
+
+
+@pytest.fixture
+def track_payload() -> dict:
+    return {'album': {'available_markets': ['GB', 'US'],
+                      'images': [{'url': 'mock_image_url'}]},
+            'available_markets': ['GB', 'US'],
+            'id': 'mock_id',
+            'name': 'mock_name'}
+
+
+class TestDecoding:
+    '''Test decoding of raw JSON response bodies'''
+
+    def test_loads(self, track_payload):
+        assert decoding.loads(json.dumps(track_payload).encode()) == track_payload
+
+    def test_loads_without_orjson(self, track_payload):
+        with patch('bpm.decoding.orjson', None):
+            assert decoding.loads(json.dumps(track_payload).encode()) == track_payload
+
+    def test_loads_selective(self, track_payload):
+        result = decoding.loads_selective(json.dumps(track_payload).encode())
+        assert result == {'album': {'images': [{'url': 'mock_image_url'}]},
+                          'id': 'mock_id',
+                          'name': 'mock_name'}
+
+    @pytest.mark.parametrize("content, expected", [
+        (b'{"available_markets" : [ "GB" ]}', b'{}'),
+        (b'{"a": 1, "available_markets": ["GB"]}', b'{"a": 1}'),
+        (b'{"available_markets":["GB"],"a":1}', b'{"a":1}'),
+        (b'{\n  "a" : 1,\n  "available_markets" : [ ],\n  "b" : 2\n}', b'{\n  "a" : 1,\n  "b" : 2\n}'),
+        (b'{"name": "available_markets", "a": 1}', b'{"name": "available_markets", "a": 1}'),
+        (b'{"available_markets": [["GB"]]}', b'{"available_markets": [["GB"]]}'),
+    ])
+    def test_prune(self, content, expected):
+        assert decoding.prune(content) == expected
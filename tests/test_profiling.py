@@ -0,0 +1,152 @@
+"""Tests for profiling.py module"""
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from flask import Flask
+from bpm import profiling
+
+
+@profiling.traced("mock_span")
+def mock_function(value):
+    return value
+
+
+def create_profiled_app(directory: str, sample_rate: float = 0.0, max_dumps: int = 100) -> Flask:
+    app = Flask(__name__)
+    app.config.from_mapping(PROFILING_ENABLED=True,
+                            PROFILING_HEADER="X-BPM-Profile",
+                            PROFILING_SAMPLE_RATE=sample_rate,
+                            PROFILING_DIR=directory,
+                            PROFILING_SECRET="mock_secret",
+                            PROFILING_MAX_DUMPS=max_dumps)
+    profiling.init_app(app)
+
+    @app.route("/")
+    def index():
+        return mock_function("mock_response")
+
+    return app
+
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    return create_profiled_app(str(tmp_path))
+
+
+class TestTraced:
+    '''Test the traced decorator'''
+
+    def test_not_profiled(self):
+        assert mock_function("mock_value") == "mock_value"
+        assert profiling._timeline.get() is None
+
+    def test_profiled(self):
+        token = profiling._timeline.set([])
+        try:
+            mock_function("mock_value")
+            (name, start, end), = profiling._timeline.get()
+        finally:
+            profiling._timeline.reset(token)
+        assert name == "mock_span"
+        assert end >= start
+
+
+class TestServerTiming:
+    '''Test formatting of the Server-Timing header'''
+
+    def test_server_timing(self):
+        timing = profiling.server_timing([("search", 1.5, 1.6), ("_get_access_token", 1.1, 1.2)],
+                                         1.0, 2.0)
+        assert timing == ('_get_access_token;dur=100.0;desc="@100.0", '
+                          'search;dur=100.0;desc="@500.0", total;dur=1000.0')
+
+
+class TestInitApp:
+    '''Test profiling of requests'''
+
+    def test_disabled(self):
+        app = Flask(__name__)
+        app.config["PROFILING_ENABLED"] = False
+        profiling.init_app(app)
+        assert not app.before_request_funcs
+
+    def test_request_without_header(self, profiled_app):
+        response = profiled_app.test_client().get("/")
+        assert "Server-Timing" not in response.headers
+
+    def test_request_with_header(self, profiled_app, tmp_path):
+        response = profiled_app.test_client().get("/", headers={"X-BPM-Profile": "1"})
+        assert response.headers["Server-Timing"].startswith("mock_span;dur=")
+        assert list(tmp_path.iterdir()) == []
+
+    def test_sampled_request(self, tmp_path):
+        app = create_profiled_app(str(tmp_path), sample_rate=1.0)
+        response = app.test_client().get("/")
+        assert "mock_span" in response.headers["Server-Timing"]
+
+    def test_cprofile_dump(self, profiled_app, tmp_path):
+        response = profiled_app.test_client().get("/", headers={"X-BPM-Profile": "mock_secret"})
+        assert "Server-Timing" in response.headers
+        dumps = list(tmp_path.iterdir())
+        assert len(dumps) == 1 and dumps[0].suffix == ".prof"
+
+    def test_cprofile_dump_requires_secret(self, profiled_app, tmp_path):
+        response = profiled_app.test_client().get("/", headers={"X-BPM-Profile": "cprofile"})
+        assert "Server-Timing" in response.headers
+        assert list(tmp_path.iterdir()) == []
+
+    def test_old_dumps_removed(self, tmp_path):
+        app = create_profiled_app(str(tmp_path), max_dumps=2)
+        for _ in range(3):
+            app.test_client().get("/", headers={"X-BPM-Profile": "mock_secret"})
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_overlapping_cprofile_requests(self, tmp_path):
+        app = create_profiled_app(str(tmp_path))
+        release = threading.Event()
+
+        @app.route("/slow")
+        def slow():
+            release.wait(5)
+            return mock_function("mock_response")
+
+        responses = []
+        first = threading.Thread(target=lambda: responses.append(app.test_client().get(
+            "/slow", headers={"X-BPM-Profile": "mock_secret"})))
+        first.start()
+        try:
+            deadline = time.monotonic() + 5
+            while not profiling._profiler_lock.locked():
+                if time.monotonic() > deadline:
+                    pytest.fail("first request was not profiled")
+                time.sleep(0.01)
+            # the second request keeps its timeline but skips the cProfile dump
+            second = app.test_client().get("/", headers={"X-BPM-Profile": "mock_secret"})
+            assert second.status_code == 200
+            assert "mock_span" in second.headers["Server-Timing"]
+        finally:
+            release.set()
+            first.join()
+        assert responses[0].status_code == 200
+        assert len(list(tmp_path.iterdir())) == 1
+        assert not profiling._profiler_lock.locked()
+
+    def test_other_profiler_active(self, profiled_app, tmp_path):
+        with patch('bpm.profiling.cProfile.Profile') as mock_profile:
+            mock_profile.return_value.enable.side_effect = ValueError
+            response = profiled_app.test_client().get("/", headers={"X-BPM-Profile": "mock_secret"})
+        assert response.status_code == 200
+        assert "Server-Timing" in response.headers
+        assert list(tmp_path.iterdir()) == []
+        assert not profiling._profiler_lock.locked()
+
+    def test_lock_released_on_error(self, profiled_app):
+        @profiled_app.route("/error")
+        def error():
+            raise Exception("mock_error")
+
+        response = profiled_app.test_client().get("/error",
+                                                  headers={"X-BPM-Profile": "mock_secret"})
+        assert response.status_code == 500
+        assert not profiling._profiler_lock.locked()
@@ -0,0 +1,125 @@
+"""Tests for snapshot.py module"""
+import pickle
+import zlib
+import pytest
+from unittest.mock import patch
+from flask import Flask
+from bpm import snapshot
+from bpm.cache import TTLCache
+from bpm.track import Track, encode_key
+
+
+@pytest.fixture
+def mock_track() -> Track:
+    return Track('mock_track_id', track_name='mock_name', artist='mock_artist',
+                 images=(('mock_image_url', 640),), key_code=encode_key(4, 1), tempo=120)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path) -> str:
+    return str(tmp_path / "mock.snapshot")
+
+
+class TestCacheSnapshot:
+    '''Test exporting and restoring TTLCache entries'''
+
+    def test_restore_keeps_expiry(self):
+        cache = TTLCache(ttl=10)
+        with patch('bpm.cache.time.time', return_value=1000):
+            cache.set("mock_key", "mock_value")
+            entries = cache.snapshot()
+        restored = TTLCache(ttl=3600)
+        with patch('bpm.cache.time.time', return_value=1005):
+            assert restored.restore(entries) == 1
+            assert restored.get("mock_key") == "mock_value"
+        with patch('bpm.cache.time.time', return_value=1011):
+            assert "mock_key" not in restored
+
+    def test_restore_skips_expired(self):
+        cache = TTLCache()
+        assert cache.restore([("mock_key", 0, "mock_value")]) == 0
+        assert len(cache) == 0
+
+    def test_restore_keeps_recency_order(self):
+        cache = TTLCache()
+        for key in ("first", "second", "third"):
+            cache.set(key, key)
+        restored = TTLCache(max_entries=2)
+        restored.restore(cache.snapshot())
+        assert "first" not in restored
+        assert [key for key, _, _ in restored.snapshot()] == ["second", "third"]
+
+
+class TestSnapshot:
+    '''Test saving and loading snapshots of the SpotifyAPI caches'''
+
+    def test_track_pickle(self, mock_track):
+        assert pickle.loads(pickle.dumps(mock_track)) == mock_track
+
+    def test_save_and_load(self, mock_spotify_api_class, mock_track, snapshot_path):
+        mock_spotify_api_class.track_cache.set('mock_track_id', mock_track)
+        mock_spotify_api_class.search_cache.set((('track', 'mock_name'),), [mock_track])
+        snapshot.save(mock_spotify_api_class, snapshot_path)
+
+        mock_spotify_api_class.track_cache = TTLCache()
+        mock_spotify_api_class.search_cache = TTLCache()
+        assert snapshot.load(mock_spotify_api_class, snapshot_path) == 2
+        assert mock_spotify_api_class.get_track('mock_track_id') == mock_track
+        assert mock_spotify_api_class.is_search_cached({'track': 'mock_name'})
+
+    def test_load_missing_snapshot(self, mock_spotify_api_class, snapshot_path):
+        assert snapshot.load(mock_spotify_api_class, snapshot_path) == 0
+
+    def test_load_invalid_snapshot(self, mock_spotify_api_class, snapshot_path):
+        with open(snapshot_path, "wb") as snapshot_file:
+            snapshot_file.write(b"mock_invalid_snapshot")
+        assert snapshot.load(mock_spotify_api_class, snapshot_path) == 0
+
+    def test_load_snapshot_from_old_code(self, mock_spotify_api_class, snapshot_path):
+        # a global that no longer exists, eg a class renamed since the snapshot was saved
+        data = b"cbpm.snapshot\nMissing\n."
+        with open(snapshot_path, "wb") as snapshot_file:
+            snapshot_file.write(zlib.compress(data))
+        assert snapshot.load(mock_spotify_api_class, snapshot_path) == 0
+
+    def test_load_incompatible_schema(self, mock_spotify_api_class, mock_track, snapshot_path):
+        entries = {"tracks": [('mock_track_id', 2**40, mock_track)]}
+        with open(snapshot_path, "wb") as snapshot_file:
+            snapshot_file.write(zlib.compress(pickle.dumps(((1, ("track_id",)), entries))))
+        assert snapshot.load(mock_spotify_api_class, snapshot_path) == 0
+
+    def test_save_merges_workers(self, mock_spotify_api_class, mock_track, snapshot_path):
+        other_track = mock_track.replace(track_id='other_track_id')
+        mock_spotify_api_class.track_cache.set('mock_track_id', mock_track)
+        snapshot.save(mock_spotify_api_class, snapshot_path)
+
+        # a second worker with a newer copy of the same track and another track
+        mock_spotify_api_class.track_cache = TTLCache()
+        mock_spotify_api_class.track_cache.set('mock_track_id', other_track)
+        mock_spotify_api_class.track_cache.set('other_track_id', other_track)
+        snapshot.save(mock_spotify_api_class, snapshot_path)
+
+        mock_spotify_api_class.track_cache = TTLCache()
+        assert snapshot.load(mock_spotify_api_class, snapshot_path) == 2
+        assert mock_spotify_api_class.get_track('mock_track_id') == other_track
+
+    def test_merge_keeps_latest_expiry(self):
+        old = {"tracks": [("a", 2**40, "old_a"), ("b", 2**40, "old_b")]}
+        new = {"tracks": [("a", 2**39, "new_a"), ("c", 2**40, "new_c")]}
+        assert snapshot.merge(old, new, max_entries=3) == {
+            "tracks": [("a", 2**40, "old_a"), ("b", 2**40, "old_b"), ("c", 2**40, "new_c")]}
+        assert snapshot.merge(old, new, max_entries=2) == {
+            "tracks": [("b", 2**40, "old_b"), ("c", 2**40, "new_c")]}
+
+    def test_init_app(self, mock_spotify_api_class, mock_track, snapshot_path):
+        mock_spotify_api_class.track_cache.set('mock_track_id', mock_track)
+        snapshot.save(mock_spotify_api_class, snapshot_path)
+        mock_spotify_api_class.track_cache = TTLCache()
+
+        app = Flask(__name__)
+        app.config["CACHE_SNAPSHOT_PATH"] = snapshot_path
+        with patch('bpm.snapshot.atexit.register') as mock_register:
+            snapshot.init_app(app, mock_spotify_api_class)
+            mock_register.assert_called_once_with(snapshot.save, mock_spotify_api_class,
+                                                  snapshot_path)
+        assert mock_spotify_api_class.is_track_cached('mock_track_id')
@@ -137,4 +137,41 @@ class TestPublicClassMethods:
         with patch('bpm.spotify.requests.get') as mock_requests:
             mock_requests.return_value = valid_track_data_request
             result = mock_spotify_api_class.get_track(lookup_id="mock_track_id")
-            assert result == valid_get_track_data
\ No newline at end of file
+            assert result == valid_get_track_data
+
+
+class TestCaching:
+    '''Test caching of formatted data in the SpotifyAPI Class using Mock'''
+
+    def test_get_track_cached(self, mock_spotify_api_class, valid_track_data_request, valid_get_track_data):
+        with patch('bpm.spotify.requests.get') as mock_requests:
+            mock_requests.return_value = valid_track_data_request
+            assert not mock_spotify_api_class.is_track_cached("mock_track_id")
+            mock_spotify_api_class.get_track(lookup_id="mock_track_id")
+            assert mock_spotify_api_class.is_track_cached("mock_track_id")
+            call_count = mock_requests.call_count
+            result = mock_spotify_api_class.get_track(lookup_id="mock_track_id")
+            assert result == valid_get_track_data
+            assert mock_requests.call_count == call_count
+
+    def test_get_tracks_cached(self, mock_spotify_api_class, valid_request, valid_get_tracks_data):
+        query = {"track": "mock_track_name", "artist": "mock_artist"}
+        with patch('bpm.spotify.requests.get') as mock_requests:
+            mock_requests.return_value = valid_request
+            mock_spotify_api_class.get_tracks(query=query)
+            assert mock_spotify_api_class.is_search_cached(dict(reversed(list(query.items()))))
+            result = mock_spotify_api_class.get_tracks(query=query)
+            assert result == valid_get_tracks_data
+            assert mock_requests.call_count == 1
+
+    def test_failed_search_not_cached(self, mock_spotify_api_class, invalid_request):
+        with patch('bpm.spotify.requests.get') as mock_requests:
+            mock_requests.return_value = invalid_request
+            assert mock_spotify_api_class.get_tracks(query={"track": "mock_track_name"}) == []
+            assert not mock_spotify_api_class.is_search_cached({"track": "mock_track_name"})
+
+    def test_set_cache_limits(self, mock_spotify_api_class):
+        mock_spotify_api_class.set_cache_limits(5, 60)
+        for cache in (mock_spotify_api_class.track_cache, mock_spotify_api_class.features_cache,
+                      mock_spotify_api_class.search_cache):
+            assert (cache.max_entries, cache.ttl) == (5, 60)
@@ -0,0 +1,86 @@
+"""Tests for suggest.py module"""
+import pytest
+from unittest.mock import Mock
+from bpm.suggest import PrefixCache
+from bpm.track import Track
+
+
+@pytest.fixture
+def mock_tracks() -> list:
+    return [Track('mock_id_1', track_name='Money', artist='mock_artist'),
+            Track('mock_id_2', track_name='Money For Nothing', artist='mock_artist'),
+            Track('mock_id_3', track_name='Monday', artist='mock_artist')]
+
+
+class TestPrefixCache:
+    '''Test the PrefixCache class'''
+
+    def test_normalise(self):
+        assert PrefixCache().normalise("  Money   For ") == "money for"
+        assert PrefixCache().normalise(None) == ""
+
+    def test_long_query_truncated(self, mock_tracks):
+        cache = PrefixCache(max_length=8, debounce=0)
+        fetch = Mock(return_value=mock_tracks)
+        cache.suggest("m" * 200000, "client", fetch)
+        fetch.assert_called_once_with("m" * 8)
+        assert cache.is_cached("m" * 200000)
+        node, depth = cache._root, 0
+        while node.children:
+            node, depth = node.children["m"], depth + 1
+        assert depth == 8
+
+    def test_empty_results_not_cached(self, mock_tracks):
+        cache = PrefixCache(debounce=0)
+        fetch = Mock(side_effect=[[], mock_tracks])
+        assert cache.suggest("mon", "client", fetch) == []
+        assert not cache.is_cached("mon")
+        assert cache.suggest("mon", "client", fetch) == mock_tracks
+        assert fetch.call_count == 2
+
+    def test_only_fetches_unseen_prefixes(self, mock_tracks):
+        cache = PrefixCache(debounce=0)
+        fetch = Mock(return_value=mock_tracks)
+        assert cache.suggest("Mon", "client", fetch) == mock_tracks
+        assert cache.suggest("mon ", "client", fetch) == mock_tracks
+        fetch.assert_called_once_with("mon")
+
+    def test_short_prefix(self):
+        fetch = Mock()
+        assert PrefixCache(min_length=2).suggest("m", "client", fetch) == []
+        fetch.assert_not_called()
+
+    def test_max_results(self, mock_tracks):
+        cache = PrefixCache(max_results=2, debounce=0)
+        assert cache.suggest("mon", "client", Mock(return_value=mock_tracks)) == mock_tracks[:2]
+        assert cache.get("mon") == mock_tracks[:2]
+
+    def test_debounced_client_served_from_nearest_prefix(self, mock_tracks):
+        cache = PrefixCache(debounce=60)
+        fetch = Mock(return_value=mock_tracks)
+        cache.suggest("mon", "client", fetch)
+        assert cache.suggest("mone", "client", fetch) == mock_tracks[:2]
+        assert fetch.call_count == 1
+        # other clients are not debounced
+        cache.suggest("mone", "other_client", fetch)
+        assert fetch.call_count == 2
+
+    def test_nearest_without_cached_prefix(self):
+        assert PrefixCache().nearest("mon") == []
+
+    def test_eviction(self, mock_tracks):
+        cache = PrefixCache(max_prefixes=2)
+        cache.put("mo", mock_tracks)
+        cache.put("mon", mock_tracks)
+        cache.get("mo")
+        cache.put("ab", mock_tracks)
+        assert len(cache) == 2
+        assert cache.get("mon") is None
+        assert cache.get("mo") == mock_tracks
+        assert "n" not in cache._root.children["m"].children["o"].children
+
+    def test_eviction_prunes_empty_nodes(self, mock_tracks):
+        cache = PrefixCache(max_prefixes=1)
+        cache.put("money", mock_tracks)
+        cache.put("ab", mock_tracks)
+        assert set(cache._root.children) == {"a"}
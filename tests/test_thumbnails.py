@@ -0,0 +1,89 @@
+"""Tests for thumbnails.py module"""
+import os
+import pytest
+from unittest.mock import patch
+from bpm import thumbnails
+
+
+@pytest.fixture
+def valid_image_id() -> str:
+    return "ab67616d0000b273aaaabbbbccccdddd"
+
+
+class TestImageId:
+    '''Test extraction of image ids from spotify image urls'''
+
+    def test_cdn_url(self, valid_image_id):
+        assert thumbnails.image_id(thumbnails.CDN_URL + valid_image_id) == valid_image_id
+
+    def test_other_url(self, valid_image_id):
+        assert thumbnails.image_id("https://example.com/image/" + valid_image_id) is None
+
+    def test_invalid_id(self):
+        assert thumbnails.image_id(thumbnails.CDN_URL + "../secret") is None
+
+
+class TestFetch:
+    '''Test fetching images into the local cache using Mock'''
+
+    def test_fetch_and_cache(self, tmp_path, valid_image_id):
+        with patch('bpm.thumbnails.requests.get') as mock_requests:
+            mock_requests.return_value.status_code = 200
+            mock_requests.return_value.content = b'mock_image'
+            first = thumbnails.fetch(str(tmp_path), valid_image_id)
+            second = thumbnails.fetch(str(tmp_path), valid_image_id)
+            assert first == second == os.path.join(str(tmp_path), valid_image_id)
+            assert mock_requests.call_count == 1
+        with open(first, "rb") as image:
+            assert image.read() == b'mock_image'
+        assert thumbnails.mimetype(first) == "image/jpeg"
+
+    def test_failed_fetch(self, tmp_path, valid_image_id, invalid_request):
+        with patch('bpm.thumbnails.requests.get') as mock_requests:
+            mock_requests.return_value = invalid_request
+            assert thumbnails.fetch(str(tmp_path), valid_image_id) is None
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_invalid_id(self, tmp_path):
+        with patch('bpm.thumbnails.requests.get') as mock_requests:
+            assert thumbnails.fetch(str(tmp_path), "../secret") is None
+            mock_requests.assert_not_called()
+
+    def test_connection_error(self, tmp_path, valid_image_id):
+        with patch('bpm.thumbnails.requests.get') as mock_requests:
+            mock_requests.side_effect = thumbnails.requests.ConnectionError
+            assert thumbnails.fetch(str(tmp_path), valid_image_id) is None
+        assert os.listdir(str(tmp_path)) == []
+
+
+class TestPrune:
+    '''Test the size bound of the local cache'''
+
+    def test_least_recently_used_removed(self, tmp_path):
+        for age, lookup_id in enumerate(["cccc" * 8, "bbbb" * 8, "aaaa" * 8]):
+            path = tmp_path / lookup_id
+            path.write_bytes(b'x' * 10)
+            os.utime(str(path), (1000 - age, 1000 - age))
+        assert thumbnails.prune(str(tmp_path), 20) == 1
+        assert sorted(os.listdir(str(tmp_path))) == ["bbbb" * 8, "cccc" * 8]
+
+    def test_fetch_prunes_cache(self, tmp_path, valid_image_id):
+        old_image = tmp_path / ("aaaa" * 8)
+        old_image.write_bytes(b'old_image')
+        os.utime(str(old_image), (1000, 1000))
+        with patch('bpm.thumbnails.requests.get') as mock_requests:
+            mock_requests.return_value.status_code = 200
+            mock_requests.return_value.content = b'mock_image'
+            thumbnails.fetch(str(tmp_path), valid_image_id, max_bytes=10)
+        assert os.listdir(str(tmp_path)) == [valid_image_id]
+
+    def test_fetch_scans_only_when_estimate_exceeded(self, tmp_path):
+        with patch('bpm.thumbnails.requests.get') as mock_requests, \
+                patch('bpm.thumbnails._prune', wraps=thumbnails._prune) as mock_prune:
+            mock_requests.return_value.status_code = 200
+            mock_requests.return_value.content = b'x' * 10
+            for lookup_id in ("aaaa" * 8, "bbbb" * 8, "cccc" * 8):
+                thumbnails.fetch(str(tmp_path), lookup_id, max_bytes=25)
+            # one scan for the first estimate, and one when the third image goes over the cap
+            assert mock_prune.call_count == 2
+        assert len(os.listdir(str(tmp_path))) == 2
@@ -0,0 +1,103 @@
+"""Tests for track.py module"""
+import pytest
+from bpm.track import Track, KEY_NAMES, NO_KEY, encode_key, format_images
+
+
+class TestEncodeKey:
+    '''Test conversion of spotify key & mode values to key codes'''
+
+    def test_major_key(self):
+        assert KEY_NAMES[encode_key(6, 1)] == "Gb Major"
+
+    def test_minor_key(self):
+        assert KEY_NAMES[encode_key(11, 0)] == "B Minor"
+
+    def test_key_without_mode(self):
+        assert KEY_NAMES[encode_key(0)] == "C"
+
+    def test_invalid_key(self):
+        assert encode_key(-1, 1) == NO_KEY
+        assert KEY_NAMES[encode_key(12)] == "No Key Available"
+
+
+class TestFormatImages:
+    '''Test conversion of spotify image data'''
+
+    def test_format_images(self):
+        images = [{'url': 'large', 'width': 640, 'height': 640},
+                  {'url': 'small', 'width': 64, 'height': 64}]
+        assert format_images(images) == (('large', 640), ('small', 64))
+
+    def test_missing_width(self):
+        assert format_images([{'url': 'mock_image_url'}]) == (('mock_image_url', None),)
+
+    def test_no_images(self):
+        assert format_images([]) is None
+
+
+class TestTrack:
+    '''Test the Track record'''
+
+    def test_key_property(self):
+        track = Track("mock_id", key_code=encode_key(4, 1))
+        assert track.key == "E Major"
+
+    def test_unknown_key(self):
+        assert Track("mock_id").key is None
+
+    def test_immutable(self):
+        track = Track("mock_id")
+        with pytest.raises(AttributeError):
+            track.tempo = 120
+        with pytest.raises(AttributeError):
+            track.anything = 1
+
+    def test_no_instance_dict(self):
+        assert not hasattr(Track("mock_id"), "__dict__")
+
+    def test_artist_interned(self):
+        first = Track("a", artist="".join(["mock_", "artist"]))
+        second = Track("b", artist="".join(["mock_", "artist"]))
+        assert first.artist is second.artist
+
+    def test_image_url_is_largest_image(self):
+        track = Track("mock_id", images=(('large', 640), ('small', 64)))
+        assert track.image_url == 'large'
+        assert Track("mock_id").image_url is None
+
+    def test_replace(self):
+        track = Track("mock_id", tempo=120)
+        replaced = track.replace(track_name="mock_name")
+        assert replaced == Track("mock_id", track_name="mock_name", tempo=120)
+        assert track.track_name is None
+
+    def test_to_dict_omits_unknown_fields(self):
+        track = Track("mock_id", key_code=encode_key(4, 1), tempo=120)
+        assert track.to_dict() == {'track_id': 'mock_id', 'key': 'E Major', 'tempo': 120}
+
+    def test_equality_and_hash(self):
+        assert Track("mock_id", tempo=1) == Track("mock_id", tempo=1)
+        assert Track("mock_id", tempo=1) != Track("mock_id", tempo=2)
+        assert len({Track("mock_id"), Track("mock_id")}) == 1
+
+
+class TestImages:
+    '''Test the packed storage of album cover images'''
+
+    def test_spotify_images_packed(self):
+        images = (("https://i.scdn.co/image/ab67616d0000b273aaaabbbbccccdddd", 640),
+                  ("https://i.scdn.co/image/ab67616d00004851aaaabbbbccccdddd", None))
+        track = Track("mock_id", images=images)
+        assert isinstance(track._images, bytes)
+        assert track.images == images
+        assert track.image_url == images[0][0]
+
+    def test_other_images_kept(self):
+        images = (("https://i.scdn.co/image/ab67616d0000b273aaaabbbbccccdddd", 640),
+                  ("https://example.com/image.jpg", 64))
+        assert Track("mock_id", images=images).images == images
+
+    def test_replace_keeps_images(self):
+        images = (("https://i.scdn.co/image/ab67616d0000b273aaaabbbbccccdddd", 640),)
+        track = Track("mock_id", images=images).replace(tempo=120)
+        assert track.images == images